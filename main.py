@@ -1,65 +1,113 @@
 import os
+import sys
 import glob
-from typing import List, Dict
+import argparse
+from typing import List, Dict, Tuple
 
 import pandas as pd
 
-from src.parse_data import parse_docx
-from src.aggregate_history import aggregate_speeds
+from src.parse_watchdog import parse_files
+from src.aggregate_history import aggregate_speeds, attach_speed_aggregates
+from src.benchmarks import update_benchmarks, rate_history
 from src.snapshot_joiner import inject_snapshot
 from src.merge_sort_export import enforce_schema_and_export
+from src.validation_and_audit import write_rejects, audit_writers
+from src.read_docx import ARCHIVE_EXTENSIONS, ARCHIVE_ERRORS, list_archive_docx
+from src import shard
+from src import query_index
+from src.run_diff import diff_runs
+from src.tensor_export import race_tensor_writers
 
 
 DATA_DIR = "data"
 OUTPUT_PREFIX = os.path.join("outputs", "all_dogs_master")
 
 
-def find_docx_files(data_dir: str = DATA_DIR) -> List[str]:
+def find_docx_files(data_dir: str = DATA_DIR) -> Tuple[List[str], List[str]]:
     """
-    Find all .docx files under data_dir (recursively).
+    Find all .docx files under data_dir (recursively), plus the .docx
+    members of any zip/tar bundles there, as "archive!member" sources.
+
+    Archive members keep archive order so tar bundles can be streamed
+    in a single pass.
+
+    Returns (sources, bad_archives): a corrupt or truncated bundle is
+    reported in bad_archives and skipped, without stopping discovery.
     """
     pattern = os.path.join(data_dir, "**", "*.docx")
-    files = glob.glob(pattern, recursive=True)
-    return sorted(files)
+    files = sorted(glob.glob(pattern, recursive=True))
+
+    archives = set()
+    for ext in ARCHIVE_EXTENSIONS:
+        archives.update(glob.glob(os.path.join(data_dir, "**", f"*{ext}"), recursive=True))
+
+    bad_archives = []
+    for archive in sorted(archives):
+        try:
+            files.extend(list_archive_docx(archive))
+        except ARCHIVE_ERRORS as e:
+            print(f"    ❌ Cannot read archive {archive}: {e}")
+            bad_archives.append(archive)
+
+    return files, bad_archives
 
 
 def main():
-    docx_files = find_docx_files()
+    docx_files, bad_archives = find_docx_files()
     if not docx_files:
         print(f"⚠ No DOCX files found under {DATA_DIR}/")
         return
 
-    all_summary_rows: List[Dict] = []
-    all_history_rows: List[Dict] = []
-
     print("📄 Processing DOCX files:")
     for path in docx_files:
         print(f"  - {path}")
-        try:
-            summary_df, hist_rows = parse_docx(path)
-        except Exception as e:
-            print(f"    ❌ Error parsing {path}: {e}")
-            continue
 
-        # Collect summary rows as dicts
-        if not summary_df.empty:
-            all_summary_rows.extend(summary_df.to_dict(orient="records"))
+    # Each file is parsed in a supervised worker; overruns are killed and
+    # retried with the safe parser (see src/parse_watchdog.py)
+    all_summary_rows, all_history_rows, rejects, failed_files = parse_files(docx_files)
+
+    run_pipeline(all_summary_rows, all_history_rows, rejects, bad_archives + failed_files, docx_files)
+
 
-        # Collect history rows (already list[dict])
-        if hist_rows:
-            all_history_rows.extend(hist_rows)
+def run_pipeline(all_summary_rows: List[Dict],
+                 all_history_rows: List[Dict],
+                 rejects: List[str],
+                 failed_files: List[str],
+                 processed_files: List[str]):
+    """
+    Everything after parsing: rejects, aggregation, snapshot, export and
+    the console summary. Shared by the single-node run and shard merge.
+    """
+    if failed_files:
+        print(f"⚠ {len(failed_files)} files could not be parsed.")
 
     if not all_summary_rows:
+        if rejects:
+            rejects_path = write_rejects(rejects)
+            print(f"⚠ {len(rejects)} rejected lines written to {rejects_path}")
         print("⚠ No dog summary rows parsed from any DOCX file.")
         return
 
-    print(f"✅ Parsed {len(all_summary_rows)} dog summary rows from {len(docx_files)} files.")
+    if rejects:
+        # Written with the audit files in the export batch below
+        print(f"⚠ {len(rejects)} rejected lines (see outputs/audit/rejects_unparsed.txt)")
+
+    print(f"✅ Parsed {len(all_summary_rows)} dog summary rows from {len(processed_files)} files.")
     print(f"✅ Parsed {len(all_history_rows)} history rows total.")
 
     # --------------------------------------------------
-    # 1) Aggregate speeds from history → summary rows
+    # 1) Update track/distance benchmarks, rate history runs
     # --------------------------------------------------
-    all_summary_rows = aggregate_speeds(all_summary_rows, all_history_rows)
+    benchmarks = update_benchmarks(all_history_rows)
+    history_df = rate_history(pd.DataFrame(all_history_rows), benchmarks)
+    all_history_rows = history_df.to_dict(orient="records")
+
+    # --------------------------------------------------
+    # 1b) Aggregate speeds + ratings from history → summary rows
+    #     (history rows carry their dog's summary key from parse time)
+    # --------------------------------------------------
+    speed_agg = aggregate_speeds(history_df)
+    all_summary_rows = attach_speed_aggregates(all_summary_rows, speed_agg)
 
     # --------------------------------------------------
     # 2) Inject most recent run snapshot into summary
@@ -68,9 +116,22 @@ def main():
 
     # --------------------------------------------------
     # 3) Enforce schema, sort, export CSV + Excel
+    #    The race × box × feature training tensor (.npy, mmap-able) and
+    #    the audit files are built from the same typed frame and
+    #    published in the same concurrent batch
     # --------------------------------------------------
     os.makedirs(os.path.dirname(OUTPUT_PREFIX), exist_ok=True)
-    df_out = enforce_schema_and_export(all_summary_rows, OUTPUT_PREFIX)
+    df_out = enforce_schema_and_export(
+        all_summary_rows,
+        OUTPUT_PREFIX,
+        extra_writers=[
+            lambda df: race_tensor_writers(df, OUTPUT_PREFIX),
+            lambda df: audit_writers(df, all_history_rows, rejects, processed_files)[1],
+        ],
+    )
+
+    # Keep the SQLite lookup index in step with the export (exported races replace theirs)
+    query_index.update_query_index(df_out)
 
     # --------------------------------------------------
     # 4) Basic validation / console summary
@@ -104,5 +165,164 @@ def main():
     print("\n🎯 Pipeline complete.")
 
 
+# --------------------------------------------------
+# Shard-and-merge mode (see src/shard.py)
+# --------------------------------------------------
+def cmd_plan(args):
+    docx_files, bad_archives = find_docx_files(args.data_dir)
+    if bad_archives:
+        print(f"⚠ {len(bad_archives)} archives could not be read and are not in the plan.")
+    if not docx_files:
+        print(f"⚠ No DOCX files found under {args.data_dir}/")
+        return 1
+    plan = shard.plan_shards(docx_files, args.shards, args.shard_dir, by=args.by)
+    print(f"🗂 Planned {len(docx_files)} files into {args.shards} shards (by {args.by}) → {args.shard_dir}")
+    for i, files in enumerate(plan["shards"]):
+        print(f"  - shard {i}: {len(files)} files")
+    return 0
+
+
+def cmd_parse(args):
+    path = shard.run_shard(args.shard_dir, args.shard, workers=args.workers)
+    print(f"✔ Shard {args.shard} written → {path}")
+    return 0
+
+
+def cmd_merge(args):
+    missing = shard.missing_shards(args.shard_dir)
+    if missing:
+        print(f"⚠ Shards not finished yet: {missing}")
+        return 1
+    plan = shard.load_plan(args.shard_dir)
+    try:
+        all_summary_rows, all_history_rows, rejects, failed_files = shard.merge_partials(args.shard_dir)
+    except ValueError as e:
+        print(f"⚠ {e}")
+        return 1
+    print(f"🔗 Merged {plan['num_shards']} shards from {args.shard_dir}")
+    run_pipeline(all_summary_rows, all_history_rows, rejects, failed_files, plan["files"])
+    return 0
+
+
+# --------------------------------------------------
+# Form lookups over the SQLite index (see src/query_index.py)
+# --------------------------------------------------
+QUERY_DISPLAY_COLUMNS = [
+    "Race_Date", "Track", "Race_No", "Box", "Dog_Name", "Trainer",
+    "Distance_m", "Race_Grade", "Odds", "Hist_Count", "Avg_Speed_km/h", "Avg_Speed_Rating",
+]
+
+
+def cmd_query(args):
+    if args.what == "refresh":
+        query_index.refresh_from_csv(args.csv, db_path=args.db)
+        return 0
+
+    if args.what == "dog":
+        rows = query_index.query_dog(args.name, last=args.last, db_path=args.db)
+    elif args.what == "trainer":
+        rows = query_index.query_trainer(args.name, last=args.last, db_path=args.db)
+    else:
+        rows = query_index.query_race(args.date, args.track, args.race_no, db_path=args.db)
+
+    if not rows:
+        print("⚠ No matching rows.")
+        return 1
+    cols = QUERY_DISPLAY_COLUMNS if not args.all_columns else list(rows[0])
+    print(pd.DataFrame(rows, columns=list(rows[0]))[cols].to_string(index=False))
+    return 0
+
+
+# --------------------------------------------------
+# Run-to-run diff by row digest (see src/run_diff.py)
+# --------------------------------------------------
+def cmd_diff(args):
+    report = diff_runs(args.old, args.new)
+
+    print(f"🔍 Diff {args.old} → {args.new}")
+    print(f"  + added rows:     {len(report['added'])}")
+    print(f"  - removed rows:   {len(report['removed'])}")
+    print(f"  ~ changed rows:   {report['changed_rows']}")
+    print(f"  = unchanged rows: {report['unchanged_rows']}")
+    if report["column_counts"]:
+        print("  Changed rows per column:")
+        for col, n in sorted(report["column_counts"].items(), key=lambda kv: -kv[1]):
+            print(f"    {col}: {n}")
+
+    if args.out:
+        os.makedirs(args.out, exist_ok=True)
+        report["added"].to_csv(os.path.join(args.out, "added.csv"), index=False)
+        report["removed"].to_csv(os.path.join(args.out, "removed.csv"), index=False)
+        report["changed"].to_csv(os.path.join(args.out, "changed_cells.csv"), index=False)
+        print(f"✔ Diff details written → {args.out}")
+
+    has_changes = len(report["added"]) or len(report["removed"]) or report["changed_rows"]
+    return 1 if has_changes else 0
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Greyhound DOCX extractor. With no command, runs the full pipeline on this machine."
+    )
+    sub = parser.add_subparsers(dest="command")
+
+    p = sub.add_parser("plan", help="Split the input files into deterministic shards")
+    p.add_argument("--shard-dir", required=True, help="Shared directory used to coordinate nodes")
+    p.add_argument("--shards", type=int, required=True, help="Number of shards")
+    p.add_argument("--by", choices=shard.SHARD_BY, default="hash", help="Shard by path hash or race date")
+    p.add_argument("--data-dir", default=DATA_DIR)
+    p.set_defaults(func=cmd_plan)
+
+    p = sub.add_parser("parse", help="Parse one shard and write its partial outputs")
+    p.add_argument("--shard-dir", required=True)
+    p.add_argument("--shard", type=int, required=True, help="Shard index (0-based)")
+    p.add_argument("--workers", type=int, default=None, help="Local worker processes")
+    p.set_defaults(func=cmd_parse)
+
+    p = sub.add_parser("merge", help="Combine all shard partials into the final outputs")
+    p.add_argument("--shard-dir", required=True)
+    p.set_defaults(func=cmd_merge)
+
+    p = sub.add_parser("query", help="Look up dogs, races or trainers in the SQLite index")
+    p.set_defaults(func=cmd_query)
+    qsub = p.add_subparsers(dest="what", required=True)
+
+    # Options shared by every query subcommand, so they can follow it
+    # (e.g. query dog "Dr. Gianna" --db index.sqlite)
+    index_opts = argparse.ArgumentParser(add_help=False)
+    index_opts.add_argument("--db", default=query_index.DB_PATH, help="Index path")
+    lookup_opts = argparse.ArgumentParser(add_help=False, parents=[index_opts])
+    lookup_opts.add_argument("--all-columns", action="store_true", help="Print every column")
+
+    q = qsub.add_parser("dog", parents=[lookup_opts], help='e.g. query dog "Dr. Gianna" --last 5')
+    q.add_argument("name")
+    q.add_argument("--last", type=int, default=5)
+
+    q = qsub.add_parser("race", parents=[lookup_opts], help="e.g. query race 2025-09-07 SALE 4")
+    q.add_argument("date")
+    q.add_argument("track")
+    q.add_argument("race_no", type=int)
+
+    q = qsub.add_parser("trainer", parents=[lookup_opts],
+                        help='e.g. query trainer "Jennifer Gill" --last 20')
+    q.add_argument("name")
+    q.add_argument("--last", type=int, default=20)
+
+    q = qsub.add_parser("refresh", parents=[index_opts], help="Reload the index from an exported CSV")
+    q.add_argument("--csv", default=f"{OUTPUT_PREFIX}.csv")
+
+    p = sub.add_parser("diff", help="Compare two runs' outputs by row digest")
+    p.add_argument("old", help="Output prefix of the old run, e.g. runs/0907/all_dogs_master")
+    p.add_argument("new", help="Output prefix of the new run, e.g. outputs/all_dogs_master")
+    p.add_argument("--out", default=None, help="Directory for added/removed/changed_cells CSVs")
+    p.set_defaults(func=cmd_diff)
+
+    return parser
+
+
 if __name__ == "__main__":
-    main()
+    args = build_arg_parser().parse_args()
+    if args.command is None:
+        main()
+    else:
+        sys.exit(args.func(args))
@@ -1,11 +1,13 @@
 import pandas as pd
-import numpy as np
+
+# Summary key carried by every history row (see parse_data.parse_data)
+SPEED_KEY = ["Track", "Race_Date", "Race_No", "Box", "Dog_Name"]
 
 def aggregate_speeds(history_df):
     """
     Input: history_df with columns:
         Track, Race_Date, Race_No, Box, Dog_Name,
-        Hist_Distance, Hist_Race_Time, Hist_Speed_km/h, Data_Source_File
+        Hist_Distance_m, Hist_Race_Time_s, Hist_Speed_km/h, Data_Source_File
 
     Output:
         speed_agg: dict keyed by (Track, Race_Date, Race_No, Box, Dog_Name)
@@ -14,6 +16,7 @@ def aggregate_speeds(history_df):
             - Min_Speed_km/h
             - Max_Speed_km/h
             - Hist_Count
+            - Avg_Speed_Rating / Max_Speed_Rating (if history is rated)
     """
 
     if history_df is None or len(history_df) == 0:
@@ -22,30 +25,52 @@ def aggregate_speeds(history_df):
     # Ensure numeric
     df = history_df.copy()
     df["Hist_Speed_km/h"] = pd.to_numeric(df["Hist_Speed_km/h"], errors="coerce")
+    has_rating = "Hist_Speed_Rating" in df.columns
+    if has_rating:
+        df["Hist_Speed_Rating"] = pd.to_numeric(df["Hist_Speed_Rating"], errors="coerce")
 
     # Group key
-    key_cols = ["Track", "Race_Date", "Race_No", "Box", "Dog_Name"]
+    key_cols = SPEED_KEY
 
-    speed_agg = {}
+    # One vectorised pass instead of a Python loop per group.
+    # observed=True: key columns may be categorical, and only real
+    # combinations should be produced (not the full cartesian product).
+    grouped = df.groupby(key_cols, observed=True, sort=False)
 
-    for key, group in df.groupby(key_cols):
-        speeds = group["Hist_Speed_km/h"].dropna()
+    # EXACT names for SUMMARY_COLUMNS
+    aggs = {
+        "Avg_Speed_km/h": ("Hist_Speed_km/h", "mean"),
+        "Min_Speed_km/h": ("Hist_Speed_km/h", "min"),
+        "Max_Speed_km/h": ("Hist_Speed_km/h", "max"),
+    }
+    # Normalized ratings (see benchmarks.rate_history), when present
+    if has_rating:
+        aggs["Avg_Speed_Rating"] = ("Hist_Speed_Rating", "mean")
+        aggs["Max_Speed_Rating"] = ("Hist_Speed_Rating", "max")
 
-        if len(speeds) == 0:
-            avg_speed = np.nan
-            min_speed = np.nan
-            max_speed = np.nan
-        else:
-            avg_speed = speeds.mean()
-            min_speed = speeds.min()
-            max_speed = speeds.max()
-
-        # EXACT names for SUMMARY_COLUMNS
-        speed_agg[key] = {
-            "Avg_Speed_km/h": avg_speed,
-            "Min_Speed_km/h": min_speed,
-            "Max_Speed_km/h": max_speed,
-            "Hist_Count": len(group),
-        }
+    stats = grouped.agg(**aggs)
+    stats["Hist_Count"] = grouped.size()
+    if has_rating:
+        stats["Avg_Speed_Rating"] = stats["Avg_Speed_Rating"].round(2)
+
+    speed_agg = {
+        key: {col: (int(val) if col == "Hist_Count" else val) for col, val in row.items()}
+        for key, row in zip(stats.index, stats.to_dict(orient="records"))
+    }
 
     return speed_agg
+
+
+def attach_speed_aggregates(summary_rows, speed_agg):
+    """
+    Copy each dog's aggregates from aggregate_speeds() onto its summary row
+    (in place). Dogs without history rows get Hist_Count 0; their speeds and
+    ratings stay blank.
+    """
+    for row in summary_rows:
+        stats = speed_agg.get(tuple(row.get(col, "") for col in SPEED_KEY))
+        if stats:
+            row.update(stats)
+        else:
+            row["Hist_Count"] = 0
+    return summary_rows
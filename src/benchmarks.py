@@ -0,0 +1,156 @@
+"""
+benchmarks.py
+-------------
+Rolling track × distance benchmark tables and normalized speed ratings.
+
+Store (outputs/benchmarks/):
+    runs.csv                       – deduplicated history runs seen so far
+    track_distance_benchmarks.csv  – median + percentile times per
+                                     (Hist_Track, Hist_Distance_m)
+
+Rules:
+    • New history is appended to the run store and deduplicated on RUN_KEY,
+      so the same run seen in many forms (or many daily runs) counts once.
+    • Only runs within BENCHMARK_WINDOW_DAYS of the newest run are kept.
+    • A track/distance needs MIN_BENCHMARK_RUNS runs to get a benchmark;
+      otherwise its ratings stay blank (no invented values).
+    • Hist_Speed_Rating = 100 × benchmark median time / run time
+      (100 = par for the track and distance, higher = faster).
+    • Ratings are added with one lookup-join, not per-row Python.
+    • Both files are published atomically (temp file + rename), so a
+      crash mid-write never leaves a truncated store behind.
+"""
+
+import os
+import pandas as pd
+from typing import List, Dict
+
+from src.output_writers import atomic_write
+
+
+BENCHMARK_DIR = os.path.join("outputs", "benchmarks")
+RUNS_FILE = "runs.csv"
+BENCHMARKS_FILE = "track_distance_benchmarks.csv"
+
+BENCHMARK_WINDOW_DAYS = 365
+MIN_BENCHMARK_RUNS = 5
+
+BENCHMARK_KEY = ["Hist_Track", "Hist_Distance_m"]
+
+# One physical run: the same race finish, whichever form reported it
+RUN_KEY = ["Hist_Date", "Hist_Track", "Hist_Distance_m", "Hist_Finish_Pos", "Hist_Race_Time_s"]
+
+TIME_QUANTILES = {
+    "P10_Time_s": 0.10,
+    "P25_Time_s": 0.25,
+    "Median_Time_s": 0.50,
+    "P75_Time_s": 0.75,
+    "P90_Time_s": 0.90,
+}
+
+BENCHMARK_COLUMNS = BENCHMARK_KEY + ["Runs"] + list(TIME_QUANTILES)
+
+
+def _coerce_keys(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Give the join keys one dtype on both sides of the lookup.
+    """
+    df["Hist_Track"] = df["Hist_Track"].astype(str).str.strip()
+    df["Hist_Distance_m"] = pd.to_numeric(df["Hist_Distance_m"], errors="coerce")
+    return df
+
+
+def _valid_runs(history_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    RUN_KEY columns of the history rows that have a date, track,
+    distance and a positive race time.
+    """
+    missing = [c for c in RUN_KEY if c not in history_df.columns]
+    if missing:
+        return pd.DataFrame(columns=RUN_KEY)
+
+    runs = _coerce_keys(history_df[RUN_KEY].copy())
+    runs["Hist_Race_Time_s"] = pd.to_numeric(runs["Hist_Race_Time_s"], errors="coerce")
+    runs["Hist_Finish_Pos"] = pd.to_numeric(runs["Hist_Finish_Pos"], errors="coerce")
+    runs["Hist_Date"] = pd.to_datetime(runs["Hist_Date"], errors="coerce").dt.strftime("%Y-%m-%d")
+
+    valid = (
+        runs["Hist_Date"].notna()
+        & (runs["Hist_Track"] != "")
+        & (runs["Hist_Distance_m"] > 0)
+        & (runs["Hist_Race_Time_s"] > 0)
+    )
+    return runs[valid]
+
+
+def update_run_store(history_rows: List[Dict], store_dir: str = BENCHMARK_DIR) -> pd.DataFrame:
+    """
+    Append new history runs to <store_dir>/runs.csv, dedupe on RUN_KEY and
+    drop runs older than the rolling window. Returns the updated store.
+    """
+    runs_path = os.path.join(store_dir, RUNS_FILE)
+
+    new_runs = _valid_runs(pd.DataFrame(history_rows))
+    if os.path.exists(runs_path):
+        stored = _valid_runs(pd.read_csv(runs_path, dtype={"Hist_Track": str}))
+        runs = pd.concat([stored, new_runs], ignore_index=True)
+    else:
+        runs = new_runs
+
+    runs = runs.drop_duplicates(subset=RUN_KEY, keep="first")
+
+    if len(runs):
+        run_dates = pd.to_datetime(runs["Hist_Date"])
+        cutoff = run_dates.max() - pd.Timedelta(days=BENCHMARK_WINDOW_DAYS)
+        runs = runs[run_dates >= cutoff]
+
+    atomic_write(runs_path, lambda p: runs.to_csv(p, index=False))
+    return runs
+
+
+def build_benchmarks(runs: pd.DataFrame) -> pd.DataFrame:
+    """
+    Median and percentile race times per (Hist_Track, Hist_Distance_m).
+    Track/distances with fewer than MIN_BENCHMARK_RUNS runs are left out.
+    """
+    if runs is None or len(runs) == 0:
+        return pd.DataFrame(columns=BENCHMARK_COLUMNS)
+
+    grouped = runs.groupby(BENCHMARK_KEY, observed=True)["Hist_Race_Time_s"]
+    table = grouped.quantile(list(TIME_QUANTILES.values())).unstack()
+    table.columns = list(TIME_QUANTILES)
+    table.insert(0, "Runs", grouped.size())
+    table = table[table["Runs"] >= MIN_BENCHMARK_RUNS].round(3).reset_index()
+
+    return table[BENCHMARK_COLUMNS]
+
+
+def update_benchmarks(history_rows: List[Dict], store_dir: str = BENCHMARK_DIR) -> pd.DataFrame:
+    """
+    Fold new history into the run store, rebuild the benchmark table and
+    write it to <store_dir>/track_distance_benchmarks.csv.
+    """
+    table = build_benchmarks(update_run_store(history_rows, store_dir))
+    atomic_write(os.path.join(store_dir, BENCHMARKS_FILE), lambda p: table.to_csv(p, index=False))
+    print(f"✔ Benchmarks: {len(table)} track/distance pairs → {store_dir}")
+    return table
+
+
+def rate_history(history_df: pd.DataFrame, benchmarks: pd.DataFrame) -> pd.DataFrame:
+    """
+    Add Hist_Benchmark_Median_s and Hist_Speed_Rating to every history row
+    with a single left lookup-join on (Hist_Track, Hist_Distance_m).
+    Rows without a benchmark or a valid time keep blank (NaN) ratings.
+    """
+    if history_df is None or len(history_df) == 0:
+        return history_df
+
+    lookup = benchmarks[BENCHMARK_KEY + ["Median_Time_s"]]
+    keys = _coerce_keys(history_df[BENCHMARK_KEY].copy())
+    median = keys.merge(lookup, on=BENCHMARK_KEY, how="left")["Median_Time_s"].to_numpy()
+
+    df = history_df.copy()
+    race_time = pd.to_numeric(df["Hist_Race_Time_s"], errors="coerce").where(lambda t: t > 0)
+    df["Hist_Benchmark_Median_s"] = median
+    df["Hist_Speed_Rating"] = (100 * median / race_time).round(2)
+    return df
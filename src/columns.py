@@ -1,5 +1,20 @@
 # src/columns.py
 
+# Most recent run snapshot, injected into each summary row (snapshot_joiner.py)
+SNAPSHOT_COLUMNS = [
+    "Hist_Date", "Hist_Track", "Hist_Distance", "Hist_Finish_Pos", "Hist_Margin_L",
+    "Hist_Race_Time", "Hist_Sec_Time", "Hist_Sec_Time_Adj", "Hist_Speed_km/h",
+    "Hist_SOT", "Hist_RST", "Hist_BP", "Hist_Odds", "Hist_API", "Hist_Prize_Won",
+    "Hist_Winner", "Hist_2nd_Place", "Hist_3rd_Place", "Hist_Settled_Turn",
+    "Hist_Ongoing_Winners", "Hist_Track_Direction",
+]
+
+# Snapshot fields whose value comes from a differently named history column
+SNAPSHOT_SOURCES = {
+    "Hist_Distance": "Hist_Distance_m",
+    "Hist_Race_Time": "Hist_Race_Time_s",
+}
+
 # List of all columns expected in the race summary output
 SUMMARY_COLUMNS = [
     # Meeting-level fields
@@ -11,13 +26,32 @@ SUMMARY_COLUMNS = [
     "Career_Wins", "Career_Seconds", "Career_Thirds", "Career_Starters",
     "Win_Percent", "Place_Percent", "Career_PrizeMoney",
     "PrizeMoneyWon", "Odds",
+    # History aggregates (aggregate_history.py) + normalized ratings (benchmarks.py)
+    "Hist_Count", "Avg_Speed_km/h", "Min_Speed_km/h", "Max_Speed_km/h",
+    "Avg_Speed_Rating", "Max_Speed_Rating",
+    # Most recent run snapshot
+    *SNAPSHOT_COLUMNS,
+    # Provenance: source file, or "archive!member" for bundled forms
+    "Data_Source_File",
     # (Add additional fields as needed up to 60 total, e.g. race margin, sectional times, etc.)
 ]
 
+# Sort / dedupe key for summary rows (one row per dog per race)
+DEDUPE_KEY = ["Race_Date", "Track", "Race_No", "Dog_Name", "Box"]
+
 # List of columns for each historical run record
 HISTORY_COLUMNS = [
     "Hist_Date", "Hist_Track", "Hist_Distance_m",
     "Hist_Race_Time_s", "Hist_Finish_Pos", "Hist_Prize_Won",
-    "Hist_Odds",
+    "Hist_Odds", "Hist_Speed_mps", "Hist_Speed_km/h",
+    # Normalized against the track/distance benchmark (benchmarks.py)
+    "Hist_Benchmark_Median_s", "Hist_Speed_Rating",
     # If needed, also include fields like sectional times, track direction, etc.
 ]
+
+# Low-cardinality string columns that repeat on nearly every row.
+# Interned at parse time and dictionary-encoded (pandas "category") on export.
+CATEGORICAL_COLUMNS = [
+    "Track", "Race_Grade", "Dog_Name", "ColourCode", "Sex",
+    "Trainer", "Owner", "Hist_Track",
+]
@@ -8,7 +8,9 @@ Race_Date → Track → Race_No → Dog_Name → Box
 
 import pandas as pd
 from datetime import datetime
-from src.columns import SUMMARY_COLUMNS
+from src.columns import SUMMARY_COLUMNS, CATEGORICAL_COLUMNS, DEDUPE_KEY
+from src.run_diff import build_digest_index, DIGEST_SUFFIX
+from src.output_writers import write_outputs
 
 
 def _ensure_schema(df: pd.DataFrame) -> pd.DataFrame:
@@ -18,6 +20,8 @@ def _ensure_schema(df: pd.DataFrame) -> pd.DataFrame:
 
     Any missing columns are added as blank strings.
     Any extra columns are dropped.
+    Repeated string columns (CATEGORICAL_COLUMNS) are dictionary-encoded
+    as pandas "category" dtype.
     """
 
     # Insert missing columns
@@ -28,6 +32,9 @@ def _ensure_schema(df: pd.DataFrame) -> pd.DataFrame:
     # Keep only schema columns (drop everything else)
     df = df[SUMMARY_COLUMNS]
 
+    # Dictionary-encode repeated strings (Track, Trainer, Dog_Name, ...)
+    df = df.astype({col: "category" for col in CATEGORICAL_COLUMNS if col in df.columns})
+
     return df
 
 
@@ -46,7 +53,7 @@ def _dedupe_sort(df: pd.DataFrame) -> pd.DataFrame:
     This ensures stable ordering across runs and consistent export.
     """
 
-    sort_keys = ["Race_Date", "Track", "Race_No", "Dog_Name", "Box"]
+    sort_keys = DEDUPE_KEY
 
     # Convert Race_No to numeric where possible so race 10 > race 2
     if "Race_No" in df.columns:
@@ -60,16 +67,22 @@ def _dedupe_sort(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
-def enforce_schema_and_export(summary_rows: list[dict], output_prefix: str):
+def enforce_schema_and_export(summary_rows: list[dict], output_prefix: str,
+                              extra_writers: list = None):
     """
     Main export function.
 
     summary_rows: list of dicts from aggregation layer
     output_prefix: file prefix used for Excel + CSV (e.g. "outputs/all_dogs_master")
+    extra_writers: writer factories, each called with the typed frame and
+                   returning more writer tasks ({name: (path, write_fn)}) to
+                   publish in the same concurrent batch (tensor, audit files, ...)
 
-    Produces:
+    Produces (all written concurrently, each published atomically):
         <prefix>.csv
         <prefix>.xlsx
+        <prefix>.digests.csv   (per-row digest index, see run_diff.py)
+        <prefix>.manifest.json (checksums + timings, see output_writers.py)
     """
 
     df = pd.DataFrame(summary_rows)
@@ -85,14 +98,23 @@ def enforce_schema_and_export(summary_rows: list[dict], output_prefix: str):
     if "Parse_Timestamp" in df.columns:
         df["Parse_Timestamp"] = timestamp
 
-    # 4. Write CSV + Excel
-    csv_path = f"{output_prefix}.csv"
-    xlsx_path = f"{output_prefix}.xlsx"
-
-    df.to_csv(csv_path, index=False, encoding="utf-8-sig")
-    df.to_excel(xlsx_path, index=False)
-
-    print(f"✔ Exported CSV → {csv_path}")
-    print(f"✔ Exported Excel → {xlsx_path}")
+    # 4. Write every output concurrently from the one typed frame
+    tasks = {
+        "csv": (f"{output_prefix}.csv",
+                lambda p: df.to_csv(p, index=False, encoding="utf-8-sig")),
+        "xlsx": (f"{output_prefix}.xlsx",
+                 lambda p: df.to_excel(p, index=False)),
+        "digests": (f"{output_prefix}{DIGEST_SUFFIX}",
+                    lambda p: build_digest_index(df).to_csv(p, index=False, encoding="utf-8")),
+    }
+    for make_writers in extra_writers or []:
+        tasks.update(make_writers(df))
+
+    manifest = write_outputs(tasks, manifest_path=f"{output_prefix}.manifest.json")
+
+    for name, out in manifest["outputs"].items():
+        print(f"✔ Exported {name} → {out['path']} ({out['seconds']:.2f}s)")
+    print(f"✔ Export wall time {manifest['wall_seconds']:.2f}s "
+          f"(writers summed {manifest['sum_writer_seconds']:.2f}s)")
 
     return df
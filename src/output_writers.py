@@ -0,0 +1,110 @@
+"""
+output_writers.py
+-----------------
+Concurrent output writers with atomic publish.
+
+A writer task is:
+    name → (final_path, write_fn)
+
+where write_fn(tmp_path) writes the whole file to tmp_path.
+
+Rules:
+    • All tasks run at once on a thread pool, so the export step takes as
+      long as the slowest writer rather than the sum of all of them.
+    • Each writer writes to a hidden temp file in the final directory, which
+      is then renamed over the final path (os.replace is atomic), so
+      readers never see a half-written file.
+    • A manifest records, per output: path, bytes, sha256 and seconds.
+    • A failed writer leaves the previous published file untouched; the
+      failure is recorded in the manifest and re-raised after all writers
+      have finished.
+"""
+
+import os
+import json
+import time
+import uuid
+import hashlib
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Tuple
+
+
+WriterTask = Tuple[str, Callable[[str], None]]
+
+
+def _sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def write_json(path: str, obj) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(obj, f, indent=4)
+
+
+def atomic_write(path: str, write_fn: Callable[[str], None]) -> Dict:
+    """
+    Run write_fn on a temp file next to `path`, then rename it into place.
+    The temp name keeps the extension (writers like to_excel key off it).
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = os.path.join(directory, f".tmp-{uuid.uuid4().hex[:8]}-{os.path.basename(path)}")
+
+    start = time.perf_counter()
+    try:
+        write_fn(tmp_path)
+        checksum = _sha256(tmp_path)
+        size = os.path.getsize(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    return {
+        "path": path,
+        "bytes": size,
+        "sha256": checksum,
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+def write_outputs(tasks: Dict[str, WriterTask],
+                  manifest_path: str = None,
+                  max_workers: int = None) -> Dict:
+    """
+    Run every writer task concurrently with atomic publish.
+    Writes the manifest (if a path is given) and returns it.
+    """
+    started = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    start = time.perf_counter()
+
+    outputs: Dict[str, Dict] = {}
+    first_error = None
+    with ThreadPoolExecutor(max_workers=max_workers or max(1, len(tasks))) as pool:
+        futures = {name: pool.submit(atomic_write, path, fn) for name, (path, fn) in tasks.items()}
+        for name, future in futures.items():
+            try:
+                outputs[name] = future.result()
+            except Exception as e:
+                print(f"    ❌ Writer {name} failed: {e}")
+                outputs[name] = {"path": tasks[name][0], "error": f"{e}"}
+                first_error = first_error or e
+
+    manifest = {
+        "started": started,
+        "wall_seconds": round(time.perf_counter() - start, 3),
+        "sum_writer_seconds": round(sum(o.get("seconds", 0) for o in outputs.values()), 3),
+        "outputs": outputs,
+    }
+
+    if manifest_path:
+        atomic_write(manifest_path, lambda p: write_json(p, manifest))
+
+    if first_error is not None:
+        raise first_error
+    return manifest
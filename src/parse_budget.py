@@ -0,0 +1,98 @@
+"""
+parse_budget.py
+---------------
+Time and size budgets for parsing.
+
+Budgets:
+    • FILE_BUDGET_S   – wall-clock seconds one DOCX may spend in a worker
+                        before it is killed and retried with the safe parser.
+    • LINE_BUDGET_S   – seconds a single regex match may take before the
+                        worker is killed, the line recorded as a reject and
+                        the file retried with the safe parser.
+    • MAX_LINE_CHARS  – lines longer than this are never handed to the
+                        backtracking regexes; they are rejected up front.
+
+A regex that backtracks catastrophically never returns, so it cannot be
+timed from inside the worker. Instead the worker publishes the line it is
+about to match, and when the match started, into shared memory
+(report_lines_to). The watchdog kills a worker whose current match has
+run past LINE_BUDGET_S (or whose file has run past FILE_BUDGET_S), reads
+the line back and records it as a reject.
+"""
+
+import os
+import re
+import time
+from typing import List, Optional
+
+
+FILE_BUDGET_S = float(os.environ.get("PARSE_FILE_BUDGET_S", "120"))
+LINE_BUDGET_S = float(os.environ.get("PARSE_LINE_BUDGET_S", "0.5"))
+MAX_LINE_CHARS = int(os.environ.get("PARSE_MAX_LINE_CHARS", "2000"))
+
+# How much of an offending line is kept in the rejects file
+REJECT_PREVIEW_CHARS = 200
+
+# Shared memory of a watched worker (None outside one):
+#   _line_buffer  – RawArray of c_char, the line currently being matched
+#   _line_started – RawValue of c_double, time.monotonic() when that match
+#                   started (0.0 when not in a match)
+_line_buffer = None
+_line_started = None
+
+
+def report_lines_to(buffer, started=None) -> None:
+    """
+    Publish every line handed to budgeted_search into `buffer`, and its
+    start time into `started`, while it is being matched (both cleared
+    again when the match returns).
+    """
+    global _line_buffer, _line_started
+    _line_buffer = buffer
+    _line_started = started
+
+
+def _set_current_line(line: str) -> None:
+    if _line_started is not None and not line:
+        _line_started.value = 0.0
+    if _line_buffer is not None:
+        _line_buffer.value = line[:REJECT_PREVIEW_CHARS].encode("utf-8")[:len(_line_buffer) - 1]
+    if _line_started is not None and line:
+        _line_started.value = time.monotonic()
+
+
+def read_current_line(buffer) -> str:
+    """
+    The line a (killed) worker was matching, or "" if it was not in a match.
+    """
+    return buffer.value.decode("utf-8", errors="replace")
+
+
+def budgeted_search(pattern: re.Pattern, line: str,
+                    rejects: Optional[List[str]] = None,
+                    max_chars: Optional[int] = MAX_LINE_CHARS) -> Optional[re.Match]:
+    """
+    pattern.search(line), guarded by the per-line budgets.
+
+    Lines over max_chars are rejected without running the regex
+    (max_chars=None for whole-document searches).
+    In a watched worker the match is published, so the watchdog kills it
+    once it overruns LINE_BUDGET_S. Matches that complete but overrun
+    LINE_BUDGET_S (outside a watched worker) are still returned, and the
+    line is recorded so the slow form can be inspected.
+    """
+    if max_chars is not None and len(line) > max_chars:
+        if rejects is not None:
+            rejects.append(f"[line over {max_chars} chars] {line[:REJECT_PREVIEW_CHARS]}")
+        return None
+
+    _set_current_line(line)
+    start = time.perf_counter()
+    m = pattern.search(line)
+    elapsed = time.perf_counter() - start
+    _set_current_line("")
+
+    if elapsed > LINE_BUDGET_S and rejects is not None:
+        rejects.append(f"[slow line {elapsed:.2f}s] {line[:REJECT_PREVIEW_CHARS]}")
+
+    return m
@@ -1,52 +1,169 @@
 # src/parse_data.py
 
+import io
 import re
 from datetime import datetime
-from summary_utils import normalize_summary_fields
-from columns import SUMMARY_COLUMNS
+import pandas as pd
+from docx import Document
+from src.summary_utils import normalize_summary_fields
+from src.columns import SUMMARY_COLUMNS, DEDUPE_KEY
+from src.parse_budget import budgeted_search, MAX_LINE_CHARS, REJECT_PREVIEW_CHARS
+from src.parse_history import parse_history_blocks
+from src.read_docx import open_docx_source
 
-def parse_meeting_info(paragraphs):
+# Detail line with weight, age, colour, box, sex, trainer, career stats
+# e.g. "0kg (4) bl 2 D TrainerName Horse: 7-22-56 12%-51%"
+DOG_DETAIL_PATTERN = re.compile(
+    r'(?P<weight>\d+kg)?\s*\((?P<age>\d+)\)\s+'
+    r'(?P<colour>[A-Za-z/]+)\s+'
+    r'(?P<box>\d+)\s+'
+    r'(?P<sex>[DB])\s+'
+    r'(?P<trainer>[A-Za-z ]+?)\s+Horse:\s+'
+    r'(?P<stats>(\d+-)+\d+)\s+'
+    r'(?P<win_pct>\d+)%-(?P<place_pct>\d+)%'
+)
+
+# Safe-parser pieces: the line is split on "Horse:" so neither side needs
+# the lazy trainer group or the nested stats repetition
+_SAFE_DETAIL_LEFT = re.compile(
+    r'(?P<weight>\d+kg)?\s*\((?P<age>\d+)\)\s+'
+    r'(?P<colour>[A-Za-z/]+)\s+'
+    r'(?P<box>\d+)\s+'
+    r'(?P<sex>[DB])\s+'
+    r'(?P<trainer>[A-Za-z ]+)$'
+)
+_SAFE_STATS = re.compile(r'\d+(?:-\d+)+')
+_SAFE_PCT = re.compile(r'(?P<win_pct>\d+)%-(?P<place_pct>\d+)%')
+
+# Meeting-level patterns, searched over the whole joined document
+MEETING_DATE_PATTERN = re.compile(r'(\d{1,2}/\d{1,2}/\d{4})')
+MEETING_TRACK_PATTERN = re.compile(r'\d{1,2}/\d{1,2}/\d{4}\s+([A-Za-z]+)')
+MEETING_RACE_PATTERN = re.compile(r'Race\s*No\.?\s*(\d+).*?Name:\s*([^0-9]+)')
+MEETING_DISTANCE_PATTERN = re.compile(r'Distance\s*(\d+)\s*m')
+MEETING_GRADE_PATTERN = re.compile(r'GR\s*([\d/]+)')
+MEETING_TIME_PATTERN = re.compile(r'Race Time\s*([0-9]{1,2}:[0-9]{2})')
+
+# Safe-parser pieces for MEETING_RACE_PATTERN, whose lazy .*? rescans to the
+# end of the line from every "Race No" (quadratic on a form full of them)
+_SAFE_RACE_HEAD = re.compile(r'Race\s*No\.?\s*(\d+)')
+_SAFE_RACE_NAME = re.compile(r'\s*([^0-9]+)')
+
+
+def _safe_race_match(text):
+    """
+    Linear-time equivalent of MEETING_RACE_PATTERN.search(text).
+    Returns (race_no, race_name) as the pattern's groups, or None.
+    "Name:" is located with str.find; once a line is known to hold no usable
+    "Name:" after some "Race No", later heads on that line are skipped
+    (their search range is a subset of the one that already failed).
     """
-    Extract meeting-level fields from the DOCX paragraphs.
+    dead_until = -1
+    for head in _SAFE_RACE_HEAD.finditer(text):
+        if head.start() < dead_until:
+            continue
+        # .*? does not cross a newline
+        line_end = text.find("\n", head.end())
+        if line_end < 0:
+            line_end = len(text)
+        pos = head.end()
+        while True:
+            idx = text.find("Name:", pos, line_end)
+            if idx < 0:
+                dead_until = line_end
+                break
+            name = _SAFE_RACE_NAME.match(text, idx + len("Name:"))
+            if name:
+                return head.group(1), name.group(1)
+            pos = idx + 1
+    return None
+
+def parse_meeting_info(paragraphs, safe=False, rejects=None):
+    """
+    Extract meeting-level fields from the DOCX paragraph texts.
     Returns a dict with Race_Date, Track, Race_No, Race_Name, Distance_m, Race_Grade, etc.
+
+    The patterns run over the whole document, so in regex mode every search
+    goes through budgeted_search (no length cap) and the watchdog can see
+    and kill a runaway one; safe=True uses _safe_race_match for the only
+    pattern that can go quadratic.
     """
     meeting_info = {}
-    text = " ".join(p.text for p in paragraphs if p.text.strip())
-    
-    # Example regex patterns (customize as needed):
+    text = " ".join(p for p in paragraphs if p.strip())
+
+    def search(pattern):
+        return budgeted_search(pattern, text, rejects, max_chars=None)
+
     # Date: look for dd/mm/yyyy
-    date_match = re.search(r'(\d{1,2}/\d{1,2}/\d{4})', text)
+    date_match = search(MEETING_DATE_PATTERN)
     if date_match:
         raw_date = date_match.group(1)
         # Convert to YYYY-MM-DD
         meeting_info["Race_Date"] = datetime.strptime(raw_date, "%d/%m/%Y").strftime("%Y-%m-%d")
     # Track: assume a known track name appears after date
-    track_match = re.search(r'\d{1,2}/\d{1,2}/\d{4}\s+([A-Za-z]+)', text)
+    track_match = search(MEETING_TRACK_PATTERN)
     if track_match:
         meeting_info["Track"] = track_match.group(1)
     # Race Number and Name: typically near top as "Race X. NAME"
-    race_match = re.search(r'Race\s*No\.?\s*(\d+).*?Name:\s*([^0-9]+)', text)
-    if race_match:
-        meeting_info["Race_No"] = int(race_match.group(1))
-        meeting_info["Race_Name"] = race_match.group(2).strip()
+    if safe:
+        race = _safe_race_match(text)
+    else:
+        race = search(MEETING_RACE_PATTERN)
+        race = race.groups() if race else None
+    if race:
+        meeting_info["Race_No"] = int(race[0])
+        meeting_info["Race_Name"] = race[1].strip()
     # Distance: look for number followed by "m"
-    dist_match = re.search(r'Distance\s*(\d+)\s*m', text)
+    dist_match = search(MEETING_DISTANCE_PATTERN)
     if dist_match:
         meeting_info["Distance_m"] = int(dist_match.group(1))
     # Grade: e.g. "GR 5/6 Race"
-    grade_match = re.search(r'GR\s*([\d/]+)', text)
+    grade_match = search(MEETING_GRADE_PATTERN)
     if grade_match:
         meeting_info["Race_Grade"] = grade_match.group(1)
     # Race time (if given as time of day, e.g. "Race Time 14:30")
-    time_match = re.search(r'Race Time\s*([0-9]{1,2}:[0-9]{2})', text)
+    time_match = search(MEETING_TIME_PATTERN)
     if time_match:
         meeting_info["Race_Time"] = time_match.group(1)  # already HH:MM
     return meeting_info
 
-def parse_dog_section(dog_text):
+def _safe_detail_match(detail_line, rejects=None):
+    """
+    Linear-time equivalent of DOG_DETAIL_PATTERN for the safe parser.
+    Returns a groupdict-like dict, or None if the line does not match.
+    """
+    if len(detail_line) > MAX_LINE_CHARS:
+        if rejects is not None:
+            rejects.append(f"[line over {MAX_LINE_CHARS} chars] {detail_line[:REJECT_PREVIEW_CHARS]}")
+        return None
+    left, sep, right = detail_line.partition("Horse:")
+    if not sep or left == left.rstrip():
+        return None
+    m = _SAFE_DETAIL_LEFT.search(left.rstrip())
+    if not m:
+        return None
+    fields = m.groupdict()
+    fields["trainer"] = fields["trainer"].strip()
+    if not fields["trainer"]:
+        return None
+
+    tokens = right.split()
+    if len(tokens) < 2 or not right[:1].isspace():
+        return None
+    if not _SAFE_STATS.fullmatch(tokens[0]):
+        return None
+    pct = _SAFE_PCT.match(tokens[1])
+    if not pct:
+        return None
+    fields["stats"] = tokens[0]
+    fields.update(pct.groupdict())
+    return fields
+
+def parse_dog_section(dog_text, safe=False, rejects=None):
     """
     Parse a block of text corresponding to one dog in the race summary.
     Returns a dict of extracted fields for that dog.
+
+    safe=True uses the linear-time fallback matcher for the detail line.
     """
     dog_info = {}
     # Dog Name is usually the first line (all caps, may include spaces)
@@ -54,43 +171,37 @@ def parse_dog_section(dog_text):
     if not lines:
         return dog_info
     
-    # First line should be the dog name
-    dog_info["Dog_Name"] = lines[0].strip().title()
+    # First line should be the dog name (title-cased by normalize_summary_fields)
+    dog_info["Dog_Name"] = lines[0]
     
     # Attempt to parse the line with weight, age, colour, box, sex, trainer, career stats
-    # e.g. "0kg (4) bl 2 D TrainerName Horse: 7-22-56 12%-51%"
-    pattern = re.compile(
-        r'(?P<weight>\d+kg)?\s*\((?P<age>\d+)\)\s+'
-        r'(?P<colour>[A-Za-z/]+)\s+'
-        r'(?P<box>\d+)\s+'
-        r'(?P<sex>[DB])\s+'
-        r'(?P<trainer>[A-Za-z ]+?)\s+Horse:\s+'
-        r'(?P<stats>(\d+-)+\d+)\s+'
-        r'(?P<win_pct>\d+)%-(?P<place_pct>\d+)%'
-    )
     detail_line = lines[1] if len(lines) > 1 else ""
-    m = pattern.search(detail_line)
+    if safe:
+        m = _safe_detail_match(detail_line, rejects)
+    else:
+        m = budgeted_search(DOG_DETAIL_PATTERN, detail_line, rejects)
+        m = m.groupdict() if m else None
     if m:
-        dog_info["Age"] = int(m.group("age"))
-        dog_info["ColourCode"] = m.group("colour")
-        dog_info["Box"] = int(m.group("box"))
-        dog_info["Sex"] = m.group("sex")
-        dog_info["Trainer"] = m.group("trainer").strip().title()
+        dog_info["Age"] = int(m["age"])
+        dog_info["ColourCode"] = m["colour"]
+        dog_info["Box"] = int(m["box"])
+        dog_info["Sex"] = m["sex"]
+        dog_info["Trainer"] = m["trainer"].strip()
         # Parse career stats
-        stats_str = m.group("stats")  # e.g. "7-22-56"
+        stats_str = m["stats"]  # e.g. "7-22-56"
         stats_parts = stats_str.split('-')
         if len(stats_parts) == 3:
             dog_info["Career_Wins"] = int(stats_parts[0])
             dog_info["Career_Seconds"] = int(stats_parts[1])
             dog_info["Career_Thirds"] = 0  # If not provided, default 0
             dog_info["Career_Starters"] = int(stats_parts[2])
-        dog_info["Win_Percent"] = int(m.group("win_pct"))
-        dog_info["Place_Percent"] = int(m.group("place_pct"))
+        dog_info["Win_Percent"] = int(m["win_pct"])
+        dog_info["Place_Percent"] = int(m["place_pct"])
     # Owner: often on the line after trainer/stats
     for line in lines:
         if line.startswith("Owner:"):
             owner_name = line.split("Owner:")[1].strip()
-            dog_info["Owner"] = owner_name.title()
+            dog_info["Owner"] = owner_name
             break
     
     # Prize and odds for this race (from a line like "Prize $X Odds Y Trainer ...")
@@ -103,27 +214,30 @@ def parse_dog_section(dog_text):
         dog_info["Odds"] = float(odds_match.group(1))
     return dog_info
 
-def parse_data(doc):
+def parse_data(paragraphs, safe=False, rejects=None):
     """
     Main function to parse a DOCX race file and extract summary fields.
-    Returns a list of dicts, one per dog, with keys from SUMMARY_COLUMNS.
+    `paragraphs` is the document's paragraph texts, in order (blank ones included).
+
+    Returns (records, history_rows):
+        records      – one dict per dog, with keys from SUMMARY_COLUMNS
+        history_rows – the history runs listed in each dog's section, each
+                       carrying its dog's summary key (DEDUPE_KEY) so the
+                       aggregates and snapshot can be joined back
     """
-    from docx import Document
-    document = Document(doc)
-    paragraphs = document.paragraphs
-    
     # Extract meeting-level info
-    meeting_info = parse_meeting_info(paragraphs)
+    meeting_info = parse_meeting_info(paragraphs, safe=safe, rejects=rejects)
     
     records = []
+    history_rows = []
     # Split the document into sections for each dog (based on known markers, e.g. dog names or sequence numbers)
-    text = "\n".join(p.text for p in paragraphs)
+    text = "\n".join(paragraphs)
     dog_sections = re.split(r'\n\d+\.\s*\n', text)  # split on patterns like "1." "2." etc.
     for section in dog_sections:
         section = section.strip()
         if not section:
             continue
-        dog_info = parse_dog_section(section)
+        dog_info = parse_dog_section(section, safe=safe, rejects=rejects)
         if not dog_info.get("Dog_Name"):
             continue
         # Combine meeting and dog info, then normalize
@@ -132,5 +246,41 @@ def parse_data(doc):
         for key in SUMMARY_COLUMNS:
             record.setdefault(key, "")
         # Normalize and append
-        records.append(normalize_summary_fields(record))
-    return records
+        record = normalize_summary_fields(record)
+        records.append(record)
+
+        # History runs listed under this dog
+        section_text = "\n".join(line.strip() for line in section.splitlines())
+        for hist in parse_history_blocks(section_text, safe=safe, rejects=rejects):
+            for key in DEDUPE_KEY:
+                hist[key] = record[key]
+            history_rows.append(hist)
+    return records, history_rows
+
+def parse_docx(path, safe=False, rejects=None, data=None):
+    """
+    Parse one DOCX file into (summary_df, history_rows).
+
+    path may be a plain file or an "archive!member" source; `data` can carry
+    the member's bytes when the caller has already streamed them.
+    Every row records its origin in Data_Source_File.
+
+    The document is opened once and its paragraph text read once; both
+    the summary and the history parser work from that text.
+    History rows carry their dog's summary key (see parse_data).
+
+    safe=True switches every line-level matcher to the linear-time
+    fallback parser (used by parse_watchdog after a budget overrun).
+    Lines that blow the per-line budget are appended to `rejects`.
+    """
+    document = Document(io.BytesIO(data) if data is not None else open_docx_source(path))
+    paragraphs = [p.text for p in document.paragraphs]
+    del document  # free the XML tree before parsing
+
+    records, history_rows = parse_data(paragraphs, safe=safe, rejects=rejects)
+
+    for row in records:
+        row["Data_Source_File"] = path
+    for row in history_rows:
+        row["Data_Source_File"] = path
+    return pd.DataFrame(records), history_rows
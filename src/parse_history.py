@@ -1,63 +1,126 @@
 # src/parse_history.py
 
 import re
+import sys
 from datetime import datetime
-from columns import HISTORY_COLUMNS
+from src.columns import HISTORY_COLUMNS
+from src.parse_budget import budgeted_search, MAX_LINE_CHARS, REJECT_PREVIEW_CHARS
 
-def parse_history_blocks(text):
+# Regex to match lines like "2nd of 8 28/10/2025 Track ... Distance 400m ... Race Time 0:22.65 ... Prize Won $903"
+HIST_PATTERN = re.compile(
+    r'^(?P<finish>\d+)(?:st|nd|rd|th)\s+of\s+\d+\s+'
+    r'(?P<date>\d{1,2}/\d{1,2}/\d{4})\s+'
+    r'(?P<track>\w+)\s+'
+    r'.*?Distance\s+(?P<distance>\d+)\s*m.*?'
+    r'Race Time\s+(?P<race_time>[0-9:]+\.?\d*)\s*Sec.*?'
+    r'Prize Won\s*\$(?P<prize>\d+)'
+)
+
+# Safe-parser pieces: each is anchored at a known offset, so no lazy scanning
+_SAFE_HEAD = re.compile(
+    r'(?P<finish>\d+)(?:st|nd|rd|th)\s+of\s+\d+\s+'
+    r'(?P<date>\d{1,2}/\d{1,2}/\d{4})\s+'
+    r'(?P<track>\w+)\s'
+)
+_SAFE_DISTANCE = re.compile(r'\s+(?P<distance>\d+)\s*m')
+_SAFE_RACE_TIME = re.compile(r'\s+(?P<race_time>[0-9:]+\.?\d*)\s*Sec')
+_SAFE_PRIZE = re.compile(r'\s*\$(?P<prize>\d+)')
+
+
+def _safe_history_match(line):
+    """
+    Linear-time equivalent of HIST_PATTERN for the safe parser.
+    Keywords are located with str.find and each value is matched in place.
+    Returns a groupdict-like dict, or None if the line is not a history run.
+    """
+    head = _SAFE_HEAD.match(line)
+    if not head:
+        return None
+    fields = head.groupdict()
+    pos = head.end()
+
+    for keyword, value_pattern in (("Distance", _SAFE_DISTANCE),
+                                   ("Race Time", _SAFE_RACE_TIME),
+                                   ("Prize Won", _SAFE_PRIZE)):
+        while True:
+            idx = line.find(keyword, pos)
+            if idx < 0:
+                return None
+            m = value_pattern.match(line, idx + len(keyword))
+            if m:
+                fields.update(m.groupdict())
+                pos = m.end()
+                break
+            pos = idx + 1
+    return fields
+
+
+def _build_history_record(fields, line):
+    """
+    Convert matched history fields (finish, date, track, distance,
+    race_time, prize) into a history record dict.
+    """
+    rec = {}
+    # Position
+    rec["Hist_Finish_Pos"] = int(fields["finish"])
+    # Date (convert to ISO)
+    raw_date = fields["date"]
+    rec["Hist_Date"] = datetime.strptime(raw_date, "%d/%m/%Y").strftime("%Y-%m-%d")
+    # Track
+    rec["Hist_Track"] = sys.intern(fields["track"])
+    # Distance
+    dist = int(fields["distance"])
+    rec["Hist_Distance_m"] = dist
+    # Race time (format e.g. "0:22.65" or "22.65")
+    time_str = fields["race_time"]
+    if ":" in time_str:
+        # if format mm:ss.ss or similar
+        parts = time_str.split(':')
+        secs = float(parts[-1])
+    else:
+        secs = float(time_str)
+    rec["Hist_Race_Time_s"] = secs
+    # Prize won
+    rec["Hist_Prize_Won"] = int(fields["prize"])
+    # Odds (if present)
+    odds_match = re.search(r'Odds\s*([\d\.]+)', line)
+    if odds_match:
+        rec["Hist_Odds"] = float(odds_match.group(1))
+    else:
+        rec["Hist_Odds"] = None
+    # Compute speed (m/s and km/h) if possible
+    if dist and secs and secs != 0:
+        rec["Hist_Speed_mps"] = round(dist / secs, 2)
+        rec["Hist_Speed_km/h"] = round(dist / secs * 3.6, 2)
+    else:
+        rec["Hist_Speed_mps"] = None
+        rec["Hist_Speed_km/h"] = None
+    # Ensure all history columns are present
+    for key in HISTORY_COLUMNS:
+        rec.setdefault(key, "")
+    return rec
+
+
+def parse_history_blocks(text, safe=False, rejects=None):
     """
     Parse all historical run entries in the text.
     Returns a list of dicts with history columns.
+
+    safe=True uses the linear-time fallback matcher instead of HIST_PATTERN.
+    Lines that blow the per-line budget are appended to `rejects` (if given).
     """
     history_records = []
-    # Regex to match lines like "2nd of 8 28/10/2025 Track ... Distance 400m ... Race Time 0:22.65 ... Prize Won $903"
-    hist_pattern = re.compile(
-        r'^(?P<finish>\d+)(?:st|nd|rd|th)\s+of\s+\d+\s+'
-        r'(?P<date>\d{1,2}/\d{1,2}/\d{4})\s+'
-        r'(?P<track>\w+)\s+'
-        r'.*?Distance\s+(?P<distance>\d+)\s*m.*?'
-        r'Race Time\s+(?P<race_time>[0-9:]+\.?\d*)\s*Sec.*?'
-        r'Prize Won\s*\$(?P<prize>\d+)'
-    )
     for line in text.splitlines():
-        m = hist_pattern.search(line)
-        if not m:
-            continue
-        rec = {}
-        # Position
-        rec["Hist_Finish_Pos"] = int(m.group("finish"))
-        # Date (convert to ISO)
-        raw_date = m.group("date")
-        rec["Hist_Date"] = datetime.strptime(raw_date, "%d/%m/%Y").strftime("%Y-%m-%d")
-        # Track
-        rec["Hist_Track"] = m.group("track")
-        # Distance
-        dist = int(m.group("distance"))
-        rec["Hist_Distance_m"] = dist
-        # Race time (format e.g. "0:22.65" or "22.65")
-        time_str = m.group("race_time")
-        if ":" in time_str:
-            # if format mm:ss.ss or similar
-            parts = time_str.split(':')
-            secs = float(parts[-1])
-        else:
-            secs = float(time_str)
-        rec["Hist_Race_Time_s"] = secs
-        # Prize won
-        rec["Hist_Prize_Won"] = int(m.group("prize"))
-        # Odds (if present)
-        odds_match = re.search(r'Odds\s*([\d\.]+)', line)
-        if odds_match:
-            rec["Hist_Odds"] = float(odds_match.group(1))
+        if safe:
+            if len(line) > MAX_LINE_CHARS:
+                if rejects is not None:
+                    rejects.append(f"[line over {MAX_LINE_CHARS} chars] {line[:REJECT_PREVIEW_CHARS]}")
+                continue
+            fields = _safe_history_match(line)
         else:
-            rec["Hist_Odds"] = None
-        # Compute speed (m/s) if possible
-        if dist and secs and secs != 0:
-            rec["Hist_Speed_mps"] = round(dist / secs, 2)
-        else:
-            rec["Hist_Speed_mps"] = None
-        # Ensure all history columns are present
-        for key in HISTORY_COLUMNS:
-            rec.setdefault(key, "")
-        history_records.append(rec)
+            m = budgeted_search(HIST_PATTERN, line, rejects)
+            fields = m.groupdict() if m else None
+        if not fields:
+            continue
+        history_records.append(_build_history_record(fields, line))
     return history_records
@@ -0,0 +1,176 @@
+"""
+parse_watchdog.py
+-----------------
+Runs parse_docx for each file in a supervised worker process.
+
+Rules:
+    • Each file gets FILE_BUDGET_S seconds of wall-clock time in its worker,
+      and each regex match LINE_BUDGET_S seconds (see parse_budget).
+    • A worker that overruns either budget is killed and the file is
+      retried once with the safe (linear-time) parser.
+    • A file that also overruns in safe mode is reported as failed.
+    • Lines that blow the per-line budget, and every kill, are returned as
+      rejects for the audit rejects file. A kill records the line the
+      worker was matching when its budget ran out (see parse_budget).
+    • Results are returned in input order, whatever order workers finish in.
+    • "archive!member" sources are parsed like files. Members of tar bundles
+      are streamed to workers in one sequential pass over the archive;
+      zip members are opened by the worker directly.
+"""
+
+import os
+import time
+import multiprocessing as mp
+from collections import deque
+from multiprocessing.connection import wait
+from typing import List, Dict, Tuple
+
+from src.columns import CATEGORICAL_COLUMNS
+from src.parse_budget import (
+    FILE_BUDGET_S, LINE_BUDGET_S, REJECT_PREVIEW_CHARS, report_lines_to, read_current_line,
+)
+from src.parse_data import parse_docx
+from src.read_docx import split_archive_source, iter_archive_docx, is_tar_archive, ARCHIVE_ERRORS
+from src.summary_utils import intern_rows
+
+
+def _worker(path: str, safe: bool, data, conn, line_buffer, line_started) -> None:
+    """
+    Child process entry point: parse one file and send the result back.
+    """
+    report_lines_to(line_buffer, line_started)
+    rejects: List[str] = []
+    try:
+        summary_df, hist_rows = parse_docx(path, safe=safe, rejects=rejects, data=data)
+        conn.send(("ok", (summary_df.to_dict(orient="records"), hist_rows, rejects)))
+    except Exception as e:
+        conn.send(("error", f"{e}"))
+    finally:
+        conn.close()
+
+
+def _member_bytes(source: str, streams: Dict):
+    """
+    Bytes of a tar member, read from a single sequential stream per archive.
+    Returns None for plain files and zip members (the worker opens those
+    itself), for tar members requested out of archive order, and when the
+    stream breaks (the worker then hits the same error and reports the
+    member as failed).
+    """
+    archive, _ = split_archive_source(source)
+    if archive is None or not is_tar_archive(archive):
+        return None
+    if archive not in streams:
+        streams[archive] = iter_archive_docx(archive)
+    try:
+        for name, data in streams[archive]:
+            if name == source:
+                return data
+    except ARCHIVE_ERRORS:
+        del streams[archive]
+    return None
+
+
+def parse_files(paths: List[str],
+                workers: int = None,
+                file_budget_s: float = FILE_BUDGET_S,
+                line_budget_s: float = LINE_BUDGET_S
+                ) -> Tuple[List[Dict], List[Dict], List[str], List[str]]:
+    """
+    Parse every path under the watchdog.
+
+    Returns:
+        summary_rows   – all summary row dicts, in file order
+        history_rows   – all history row dicts, in file order
+        rejects        – offending lines / budget kills, prefixed with the file
+        failed_files   – files that produced no result
+    """
+    workers = max(1, workers or os.cpu_count() or 1)
+
+    pending = deque((p, False, None) for p in paths)
+    # conn → (process, path, safe, data, deadline, line_buffer, line_started)
+    running = {}
+    streams = {}  # tar archive → member stream
+    results: Dict[str, Tuple[List[Dict], List[Dict]]] = {}
+    rejects: List[str] = []
+    failed_files: List[str] = []
+
+    while pending or running:
+        # Top up the worker pool
+        while pending and len(running) < workers:
+            path, safe, data = pending.popleft()
+            if data is None:
+                data = _member_bytes(path, streams)
+            recv_conn, send_conn = mp.Pipe(duplex=False)
+            # UTF-8 needs up to 4 bytes per char, plus the NUL terminator
+            line_buffer = mp.RawArray("c", 4 * REJECT_PREVIEW_CHARS + 1)
+            line_started = mp.RawValue("d", 0.0)
+            proc = mp.Process(target=_worker,
+                              args=(path, safe, data, send_conn, line_buffer, line_started),
+                              daemon=True)
+            proc.start()
+            send_conn.close()
+            running[recv_conn] = (proc, path, safe, data, time.monotonic() + file_budget_s,
+                                  line_buffer, line_started)
+
+        # Wait for the first result, the nearest file deadline, or the next
+        # line-budget check (a match can start at any time, so poll)
+        next_check = min(entry[4] for entry in running.values())
+        next_check = min(next_check, time.monotonic() + line_budget_s)
+        for conn in wait(list(running), timeout=max(0.0, next_check - time.monotonic())):
+            proc, path, safe = running.pop(conn)[:3]
+            try:
+                status, payload = conn.recv()
+            except EOFError:
+                status, payload = "error", f"worker exited with code {proc.exitcode}"
+            conn.close()
+            proc.join()
+
+            if status == "ok":
+                summary_rows, hist_rows, file_rejects = payload
+                # Strings arrive as fresh objects per worker; re-intern so
+                # repeated values are shared across the whole run
+                intern_rows(summary_rows, CATEGORICAL_COLUMNS)
+                intern_rows(hist_rows, CATEGORICAL_COLUMNS)
+                results[path] = (summary_rows, hist_rows)
+                rejects.extend(f"{path}: {line}" for line in file_rejects)
+            else:
+                print(f"    ❌ Error parsing {path}: {payload}")
+                failed_files.append(path)
+
+        # Kill anything past its file budget, or stuck in one match
+        now = time.monotonic()
+        for conn, entry in list(running.items()):
+            proc, path, safe, data, deadline, line_buffer, line_started = entry
+            started = line_started.value
+            if now >= deadline:
+                overrun = f"{file_budget_s:g}s file budget"
+            elif started and now - started >= line_budget_s:
+                overrun = f"{line_budget_s:g}s line budget"
+            else:
+                continue
+            proc.kill()
+            proc.join()
+            conn.close()
+            del running[conn]
+
+            parser = "safe" if safe else "regex"
+            line = read_current_line(line_buffer)
+            kill_note = f"[killed over {overrun} with {parser} parser]"
+            rejects.append(f"{path}: {kill_note} {line}" if line else f"{path}: {kill_note}")
+            if safe:
+                print(f"    ❌ {path} exceeded the {overrun} in safe mode; skipped")
+                failed_files.append(path)
+            else:
+                print(f"    ⏱ {path} exceeded the {overrun}; retrying with safe parser")
+                pending.append((path, True, data))
+
+    all_summary_rows: List[Dict] = []
+    all_history_rows: List[Dict] = []
+    for path in paths:
+        if path in results:
+            summary_rows, hist_rows = results[path]
+            all_summary_rows.extend(summary_rows)
+            all_history_rows.extend(hist_rows)
+
+    return all_summary_rows, all_history_rows, rejects, failed_files
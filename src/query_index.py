@@ -0,0 +1,168 @@
+"""
+query_index.py
+--------------
+Embedded SQLite index over the exported Dog_Summary rows, for race-day
+form lookups without reloading the full CSV/Excel.
+
+Table:
+    dog_summary – one row per SUMMARY_COLUMNS record, unique on the
+                  dedupe key (Race_Date, Track, Race_No, Dog_Name, Box)
+
+Indexes:
+    • (Dog_Name, Race_Date, Race_No)   (Dog_Name case-insensitive)
+    • (Race_Date, Track, Race_No)      (Track case-insensitive)
+    • (Trainer, Race_Date, Race_No)    (Trainer case-insensitive)
+    Trailing date/race columns let "newest first" lookups skip the sort.
+
+Rules:
+    • update_query_index() replaces whole races: rows of every race
+      (Race_Date, Track, Race_No) in the export are deleted, then the
+      exported rows are upserted. Races not in the export are untouched,
+      so incremental runs refresh the index in place, and a runner whose
+      Dog_Name/Box was corrected by a re-parse does not linger.
+    • refresh_from_csv() rebuilds the table from the CSV alone.
+    • Read-only over exported data — values are stored exactly as exported.
+"""
+
+import os
+import sqlite3
+import pandas as pd
+from typing import List, Dict
+
+from src.columns import SUMMARY_COLUMNS, DEDUPE_KEY
+
+
+DB_PATH = os.path.join("outputs", "all_dogs_master.sqlite")
+TABLE = "dog_summary"
+
+# Unit that an export replaces in the index
+RACE_KEY = ["Race_Date", "Track", "Race_No"]
+
+# Everything else gets NUMERIC affinity, so "4" and 4 compare equal
+TEXT_COLUMNS = {
+    "Race_Date", "Race_Time", "Track", "Race_Name", "Race_Grade",
+    "Dog_Name", "ColourCode", "Sex", "Trainer", "Owner", "Data_Source_File",
+    "Hist_Date", "Hist_Track", "Hist_SOT", "Hist_RST", "Hist_Winner",
+    "Hist_2nd_Place", "Hist_3rd_Place", "Hist_Settled_Turn",
+    "Hist_Ongoing_Winners", "Hist_Track_Direction",
+}
+
+
+def _q(col: str) -> str:
+    return '"' + col.replace('"', '""') + '"'
+
+
+def _connect(db_path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def _col_def(col: str) -> str:
+    return f"{_q(col)} {'TEXT' if col in TEXT_COLUMNS else 'NUMERIC'}"
+
+
+def _ensure_table(conn: sqlite3.Connection) -> None:
+    col_defs = ", ".join(_col_def(c) for c in SUMMARY_COLUMNS)
+    key = ", ".join(_q(c) for c in DEDUPE_KEY)
+
+    # An index built before a schema column was added keeps its rows;
+    # the new column starts out NULL for them
+    existing = {r[1] for r in conn.execute(f"PRAGMA table_info({TABLE})")}
+    if existing:
+        for col in SUMMARY_COLUMNS:
+            if col not in existing:
+                conn.execute(f"ALTER TABLE {TABLE} ADD COLUMN {_col_def(col)}")
+
+    conn.executescript(f"""
+        CREATE TABLE IF NOT EXISTS {TABLE} ({col_defs}, UNIQUE ({key}));
+        CREATE INDEX IF NOT EXISTS idx_dog_name ON {TABLE} ("Dog_Name" COLLATE NOCASE, "Race_Date", "Race_No");
+        CREATE INDEX IF NOT EXISTS idx_race ON {TABLE} ("Race_Date", "Track" COLLATE NOCASE, "Race_No");
+        CREATE INDEX IF NOT EXISTS idx_trainer ON {TABLE} ("Trainer" COLLATE NOCASE, "Race_Date", "Race_No");
+    """)
+
+
+def update_query_index(df: pd.DataFrame, db_path: str = DB_PATH, rebuild: bool = False) -> int:
+    """
+    Write the exported summary frame into the index.
+    Every race in the frame replaces that race's rows in the index;
+    rebuild=True drops the whole table first. Returns rows written.
+    """
+    df = df.reindex(columns=SUMMARY_COLUMNS).astype(object)
+    df = df.where(df.notna(), None)
+
+    cols = ", ".join(_q(c) for c in SUMMARY_COLUMNS)
+    marks = ", ".join("?" for _ in SUMMARY_COLUMNS)
+    # IS, not =, so a blank (NULL) Race_No still matches its race
+    race_match = " AND ".join(f"{_q(c)} IS ?" for c in RACE_KEY)
+    races = df[RACE_KEY].drop_duplicates()
+
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    with _connect(db_path) as conn:
+        if rebuild:
+            conn.execute(f"DROP TABLE IF EXISTS {TABLE}")
+        _ensure_table(conn)
+        conn.executemany(
+            f"DELETE FROM {TABLE} WHERE {race_match}",
+            races.itertuples(index=False, name=None),
+        )
+        conn.executemany(
+            f"INSERT OR REPLACE INTO {TABLE} ({cols}) VALUES ({marks})",
+            df.itertuples(index=False, name=None),
+        )
+    conn.close()
+    print(f"✔ Query index updated ({len(df)} rows, {len(races)} races) → {db_path}")
+    return len(df)
+
+
+def refresh_from_csv(csv_path: str, db_path: str = DB_PATH) -> int:
+    """
+    Rebuild the index from an exporter CSV (e.g. outputs/all_dogs_master.csv).
+    """
+    df = pd.read_csv(csv_path, dtype=str, keep_default_na=False, encoding="utf-8-sig")
+    return update_query_index(df, db_path, rebuild=True)
+
+
+def _fetch(sql: str, params: tuple, db_path: str) -> List[Dict]:
+    if not os.path.exists(db_path):
+        raise FileNotFoundError(f"No query index at {db_path}; run the pipeline or 'query refresh' first")
+    with _connect(db_path) as conn:
+        rows = [dict(r) for r in conn.execute(sql, params)]
+    conn.close()
+    return rows
+
+
+def query_dog(dog_name: str, last: int = 5, db_path: str = DB_PATH) -> List[Dict]:
+    """
+    Most recent `last` summary rows for a dog (newest first).
+    """
+    return _fetch(
+        f'SELECT * FROM {TABLE} WHERE "Dog_Name" = ? COLLATE NOCASE '
+        f'ORDER BY "Race_Date" DESC, "Race_No" DESC LIMIT ?',
+        (dog_name.strip(), last),
+        db_path,
+    )
+
+
+def query_race(race_date: str, track: str, race_no, db_path: str = DB_PATH) -> List[Dict]:
+    """
+    All runners in one race, by box.
+    """
+    return _fetch(
+        f'SELECT * FROM {TABLE} WHERE "Race_Date" = ? AND "Track" = ? COLLATE NOCASE '
+        f'AND "Race_No" = ? ORDER BY "Box"',
+        (race_date.strip(), track.strip(), race_no),
+        db_path,
+    )
+
+
+def query_trainer(trainer: str, last: int = 20, db_path: str = DB_PATH) -> List[Dict]:
+    """
+    Most recent `last` runners for a trainer (newest first).
+    """
+    return _fetch(
+        f'SELECT * FROM {TABLE} WHERE "Trainer" = ? COLLATE NOCASE '
+        f'ORDER BY "Race_Date" DESC, "Race_No" DESC LIMIT ?',
+        (trainer.strip(), last),
+        db_path,
+    )
@@ -1,20 +1,116 @@
+import io
+import tarfile
+import zipfile
 from docx import Document
 
+# Form bundles are read in place; a member is addressed as "archive!member"
+ARCHIVE_SEP = "!"
+ZIP_EXTENSIONS = (".zip",)
+TAR_EXTENSIONS = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+ARCHIVE_EXTENSIONS = ZIP_EXTENSIONS + TAR_EXTENSIONS
+
+# What a corrupt or truncated bundle raises (EOFError: truncated gzip/bz2/xz)
+ARCHIVE_ERRORS = (zipfile.BadZipFile, tarfile.TarError, EOFError, OSError)
+
+
+def is_archive(path: str) -> bool:
+    return path.lower().endswith(ARCHIVE_EXTENSIONS)
+
+
+def is_tar_archive(path: str) -> bool:
+    return path.lower().endswith(TAR_EXTENSIONS)
+
+
+def _is_docx_member(name: str) -> bool:
+    # Skip macOS resource forks and Word lock files ("~$name.docx")
+    base = name.rsplit("/", 1)[-1]
+    return (name.lower().endswith(".docx")
+            and not name.startswith("__MACOSX/")
+            and not base.startswith("~$"))
+
+
+def split_archive_source(source: str):
+    """
+    Split "archive!member" into (archive, member).
+    Plain file paths return (None, source).
+    """
+    idx = source.find(ARCHIVE_SEP)
+    while idx >= 0:
+        archive = source[:idx]
+        if is_archive(archive):
+            return archive, source[idx + 1:]
+        idx = source.find(ARCHIVE_SEP, idx + 1)
+    return None, source
+
+
+def list_archive_docx(archive_path: str):
+    """
+    List the .docx members of a zip/tar archive as "archive!member"
+    sources, in archive order.
+    Raises one of ARCHIVE_ERRORS if the archive cannot be read.
+    """
+    if is_tar_archive(archive_path):
+        with tarfile.open(archive_path, "r:*") as tf:
+            names = [m.name for m in tf if m.isfile() and _is_docx_member(m.name)]
+    else:
+        with zipfile.ZipFile(archive_path) as zf:
+            names = [n for n in zf.namelist() if not n.endswith("/") and _is_docx_member(n)]
+    return [f"{archive_path}{ARCHIVE_SEP}{n}" for n in names]
+
+
+def iter_archive_docx(archive_path: str):
+    """
+    Stream (source, bytes) for every .docx member of an archive in one
+    sequential pass. Used for tar bundles, where random access to a
+    compressed member means decompressing everything before it.
+    """
+    if is_tar_archive(archive_path):
+        with tarfile.open(archive_path, "r|*") as tf:
+            for m in tf:
+                if m.isfile() and _is_docx_member(m.name):
+                    yield f"{archive_path}{ARCHIVE_SEP}{m.name}", tf.extractfile(m).read()
+    else:
+        with zipfile.ZipFile(archive_path) as zf:
+            for n in zf.namelist():
+                if not n.endswith("/") and _is_docx_member(n):
+                    yield f"{archive_path}{ARCHIVE_SEP}{n}", zf.read(n)
+
+
+def open_docx_source(source: str):
+    """
+    Return something Document() can open for a source:
+    the path itself for plain files, or an in-memory file object
+    for an "archive!member" source (nothing is extracted to disk).
+    """
+    archive, member = split_archive_source(source)
+    if archive is None:
+        return source
+    if is_tar_archive(archive):
+        with tarfile.open(archive, "r:*") as tf:
+            return io.BytesIO(tf.extractfile(member).read())
+    with zipfile.ZipFile(archive) as zf:
+        return io.BytesIO(zf.read(member))
+
+
 def _table_to_matrix(tbl):
     matrix = []
     for row in tbl.rows:
         matrix.append([cell.text.strip() if cell.text else "" for cell in row.cells])
     return matrix
 
-def load_docx(file_path: str):
+def load_docx(file_path: str, stream=None):
     """
     Load a .docx file and extract all visible content:
     - paragraphs
     - tables (as matrices)
     - headers / footers (all sections)
     Returns a dictionary with raw content blocks for parsing.
+
+    file_path may be a plain path or an "archive!member" source.
+    If `stream` (a path or file object) is given it is read instead,
+    and file_path is only kept as the provenance label.
     """
-    doc = Document(file_path)
+    doc = Document(stream if stream is not None else open_docx_source(file_path))
 
     paragraphs = [p.text.strip() for p in doc.paragraphs if p.text and p.text.strip() != ""]
 
@@ -26,12 +122,15 @@ def load_docx(file_path: str):
     footers = []
     try:
         for sec in doc.sections:
-            if sec.header:
+            # A linked header/footer repeats the previous section's content, and
+            # resolving it walks back through every earlier section (quadratic
+            # on long forms), so only read the ones that define their own.
+            if sec.header and not sec.header.is_linked_to_previous:
                 for p in sec.header.paragraphs:
                     txt = p.text.strip()
                     if txt:
                         headers.append(txt)
-            if sec.footer:
+            if sec.footer and not sec.footer.is_linked_to_previous:
                 for p in sec.footer.paragraphs:
                     txt = p.text.strip()
                     if txt:
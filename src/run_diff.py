@@ -0,0 +1,131 @@
+"""
+run_diff.py
+-----------
+Run-to-run diff of the master outputs via per-row digests.
+
+Sidecar (written next to the CSV by enforce_schema_and_export):
+    <prefix>.digests.csv – one line per exported row:
+        dedupe key columns, Row (data row number in <prefix>.csv),
+        Row_Digest (64-bit hash of the row's SUMMARY_COLUMNS values)
+
+Rules:
+    • Digests hash the values as they are written to the CSV, so two runs
+      match exactly when their exported rows match.
+    • diff_runs() compares the two sidecars only; full rows are read from
+      the CSVs just for keys whose digests differ.
+"""
+
+import os
+import pandas as pd
+from typing import Dict, List
+
+from src.columns import SUMMARY_COLUMNS, DEDUPE_KEY
+
+
+DIGEST_SUFFIX = ".digests.csv"
+
+
+def row_digests(df: pd.DataFrame) -> pd.Series:
+    """
+    Stable 64-bit digest per row (hex), over SUMMARY_COLUMNS in schema order.
+    Missing values hash as blank, like they are written to the CSV.
+    """
+    values = df.reindex(columns=SUMMARY_COLUMNS).astype(object)
+    text = values.where(values.notna(), "").astype(str)
+    hashes = pd.util.hash_pandas_object(text, index=False)
+    return hashes.map("{:016x}".format)
+
+
+def build_digest_index(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Digest index for an exported frame: dedupe key, Row, Row_Digest.
+    Written to <prefix>.digests.csv by enforce_schema_and_export.
+    """
+    index = df[DEDUPE_KEY].astype(object).copy()
+    index["Row"] = range(len(df))
+    index["Row_Digest"] = row_digests(df).to_numpy()
+    return index
+
+
+def load_digest_index(output_prefix: str) -> pd.DataFrame:
+    path = f"{output_prefix}{DIGEST_SUFFIX}"
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No digest index at {path}; re-export that run first")
+    return pd.read_csv(path, dtype=str, keep_default_na=False)
+
+
+def _read_rows(csv_path: str, rows: List[int]) -> pd.DataFrame:
+    """
+    Read only the given data rows of an exported CSV (header is line 0).
+    """
+    wanted = {r + 1 for r in rows}
+    df = pd.read_csv(
+        csv_path,
+        dtype=str,
+        keep_default_na=False,
+        encoding="utf-8-sig",
+        skiprows=lambda i: i != 0 and i not in wanted,
+    )
+    df.index = sorted(rows)
+    return df
+
+
+def diff_runs(old_prefix: str, new_prefix: str) -> Dict:
+    """
+    Compare two exported runs by digest.
+
+    Returns:
+        {
+            "added":   DataFrame of dedupe keys only in the new run,
+            "removed": DataFrame of dedupe keys only in the old run,
+            "changed": DataFrame of (key..., Column, Old, New) per changed cell,
+            "changed_rows": number of keys whose digest differs,
+            "unchanged_rows": number of identical rows,
+            "column_counts": {column: changed rows},
+        }
+    """
+    old = load_digest_index(old_prefix)
+    new = load_digest_index(new_prefix)
+
+    merged = old.merge(new, on=DEDUPE_KEY, how="outer",
+                       suffixes=("_old", "_new"), indicator=True)
+
+    added = merged.loc[merged["_merge"] == "right_only", DEDUPE_KEY]
+    removed = merged.loc[merged["_merge"] == "left_only", DEDUPE_KEY]
+    both = merged[merged["_merge"] == "both"]
+    differs = both[both["Row_Digest_old"] != both["Row_Digest_new"]]
+
+    changed = pd.DataFrame(columns=DEDUPE_KEY + ["Column", "Old", "New"])
+    column_counts: Dict[str, int] = {}
+
+    if len(differs):
+        old_rows = _read_rows(f"{old_prefix}.csv", differs["Row_old"].astype(int).tolist())
+        new_rows = _read_rows(f"{new_prefix}.csv", differs["Row_new"].astype(int).tolist())
+        old_rows = old_rows.loc[differs["Row_old"].astype(int)].reset_index(drop=True)
+        new_rows = new_rows.loc[differs["Row_new"].astype(int)].reset_index(drop=True)
+        keys = differs[DEDUPE_KEY].reset_index(drop=True)
+
+        cols = [c for c in SUMMARY_COLUMNS if c in old_rows.columns or c in new_rows.columns]
+        old_rows = old_rows.reindex(columns=cols, fill_value="")
+        new_rows = new_rows.reindex(columns=cols, fill_value="")
+
+        mask = old_rows.ne(new_rows)
+        column_counts = {c: int(n) for c, n in mask.sum().items() if n}
+
+        stacked = mask.stack()
+        hits = stacked[stacked].index
+        changed = pd.DataFrame({
+            **{k: keys.loc[hits.get_level_values(0), k].to_numpy() for k in DEDUPE_KEY},
+            "Column": hits.get_level_values(1),
+            "Old": [old_rows.at[i, c] for i, c in hits],
+            "New": [new_rows.at[i, c] for i, c in hits],
+        })
+
+    return {
+        "added": added.reset_index(drop=True),
+        "removed": removed.reset_index(drop=True),
+        "changed": changed,
+        "changed_rows": len(differs),
+        "unchanged_rows": len(both) - len(differs),
+        "column_counts": column_counts,
+    }
@@ -0,0 +1,257 @@
+"""
+shard.py
+--------
+Shard-and-merge mode: spread one large extraction over several machines.
+
+Coordination is through a shared directory only:
+
+    <shard_dir>/plan.json                   – written by plan_shards()
+    <shard_dir>/partials/shard-0003.json    – written by run_shard(3)
+
+Rules:
+    • Sharding is deterministic: by a hash of the source path, or by the
+      race date in the file name. Dates are kept together on contiguous
+      shards; when there are fewer dates than shards, the spare shards go
+      to the busiest dates and each date's files are dealt across its
+      shards in hash order.
+    • A partial holds the raw parsed summary/history rows of its shard,
+      as plain JSON (never pickle: the share may be writable by others,
+      and merge must not execute anything it reads).
+      Aggregation, snapshot and dedupe run once, at merge, over the
+      combined rows, so the final outputs match a single-node run.
+    • Partials are written to a temp file and renamed, so merge never
+      sees a half-written shard.
+    • Each plan has an id (a hash of its shard lists), recorded in every
+      partial. Re-planning deletes the old partials, and merge refuses a
+      partial whose plan id or file list does not match the current plan.
+"""
+
+import os
+import re
+import glob
+import json
+import hashlib
+from typing import List, Dict, Tuple
+
+from src.columns import CATEGORICAL_COLUMNS
+from src.parse_watchdog import parse_files
+from src.summary_utils import intern_rows
+
+
+PLAN_FILE = "plan.json"
+PARTIALS_DIR = "partials"
+SHARD_BY = ("hash", "date")
+
+_DATE_RE = re.compile(r"(\d{4}-\d{2}-\d{2})")
+
+
+def _partial_path(shard_dir: str, shard_id: int) -> str:
+    return os.path.join(shard_dir, PARTIALS_DIR, f"shard-{shard_id:04d}.json")
+
+
+def _source_date(source: str) -> str:
+    """
+    Race date from the file / member name (e.g. "SALE_2025-09-07 conv.docx").
+    Returns "" if the name carries no date.
+    """
+    m = _DATE_RE.search(os.path.basename(source))
+    return m.group(1) if m else ""
+
+
+def _source_hash(value: str) -> int:
+    return int(hashlib.sha1(value.encode("utf-8")).hexdigest(), 16)
+
+
+def _hash_shard(value: str, num_shards: int) -> int:
+    return _source_hash(value) % num_shards
+
+
+def _date_blocks(date_counts: Dict[str, int], num_shards: int) -> Dict[str, Tuple[int, int]]:
+    """
+    Give each date (in date order) a contiguous block of shards:
+    date → (first shard, number of shards).
+
+    With at least as many dates as shards, sorted dates are cut into
+    num_shards contiguous ranges (one shard per date). Otherwise every
+    date gets one shard and the spare shards go, one at a time, to the
+    date with the most files per shard (never more shards than files).
+    """
+    dates = sorted(date_counts)
+    if len(dates) >= num_shards:
+        return {d: (i * num_shards // len(dates), 1) for i, d in enumerate(dates)}
+
+    sizes = {d: 1 for d in dates}
+    for _ in range(num_shards - len(dates)):
+        splittable = [d for d in dates if sizes[d] < date_counts[d]]
+        if not splittable:
+            break
+        busiest = max(splittable, key=lambda d: date_counts[d] / sizes[d])
+        sizes[busiest] += 1
+
+    blocks, start = {}, 0
+    for d in dates:
+        blocks[d] = (start, sizes[d])
+        start += sizes[d]
+    return blocks
+
+
+def assign_shards(sources: List[str], num_shards: int, by: str = "hash") -> List[List[str]]:
+    """
+    Split sources into num_shards deterministic lists (input order kept
+    within each shard).
+
+    by="hash": shard = sha1(source) mod num_shards.
+    by="date": each race date gets a contiguous block of shards (see
+               _date_blocks); a date's files are dealt round-robin across
+               its block in sha1 order. Sources without a date in their
+               name fall back to hash.
+    """
+    if by not in SHARD_BY:
+        raise ValueError(f"Unknown shard mode {by!r}; expected one of {SHARD_BY}")
+    if num_shards < 1:
+        raise ValueError("num_shards must be >= 1")
+
+    shards: List[List[str]] = [[] for _ in range(num_shards)]
+
+    if by == "date":
+        by_date: Dict[str, List[str]] = {}
+        for source in sources:
+            date = _source_date(source)
+            if date:
+                by_date.setdefault(date, []).append(source)
+        blocks = _date_blocks({d: len(files) for d, files in by_date.items()}, num_shards)
+
+        source_shard = {}
+        for date, files in by_date.items():
+            first, size = blocks[date]
+            for i, source in enumerate(sorted(set(files), key=_source_hash)):
+                source_shard[source] = first + i % size
+
+    for source in sources:
+        if by == "date" and source in source_shard:
+            shard_id = source_shard[source]
+        else:
+            shard_id = _hash_shard(source, num_shards)
+        shards[shard_id].append(source)
+
+    return shards
+
+
+def _plan_id(plan: Dict) -> str:
+    key = json.dumps([plan["by"], plan["files"], plan["shards"]])
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def plan_shards(sources: List[str], num_shards: int, shard_dir: str, by: str = "hash") -> Dict:
+    """
+    Write <shard_dir>/plan.json and return the plan.
+    The plan keeps the full source list in order so merge can restore it.
+    Partials left over from an earlier plan are deleted.
+    """
+    plan = {
+        "num_shards": num_shards,
+        "by": by,
+        "files": list(sources),
+        "shards": assign_shards(sources, num_shards, by),
+    }
+    plan["plan_id"] = _plan_id(plan)
+    partials_dir = os.path.join(shard_dir, PARTIALS_DIR)
+    os.makedirs(partials_dir, exist_ok=True)
+    for old in glob.glob(os.path.join(partials_dir, "shard-*.json")):
+        os.remove(old)
+    _atomic_write(os.path.join(shard_dir, PLAN_FILE),
+                  json.dumps(plan, indent=2).encode("utf-8"))
+    return plan
+
+
+def load_plan(shard_dir: str) -> Dict:
+    with open(os.path.join(shard_dir, PLAN_FILE), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _atomic_write(path: str, data: bytes) -> None:
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def run_shard(shard_dir: str, shard_id: int, workers: int = None) -> str:
+    """
+    Parse one shard of the plan and write its partial.
+    Returns the partial's path.
+    """
+    plan = load_plan(shard_dir)
+    if not 0 <= shard_id < plan["num_shards"]:
+        raise ValueError(f"Shard {shard_id} out of range (plan has {plan['num_shards']})")
+
+    sources = plan["shards"][shard_id]
+    summary_rows, history_rows, rejects, failed_files = parse_files(sources, workers=workers)
+
+    partial = {
+        "shard": shard_id,
+        "plan_id": plan["plan_id"],
+        "files": sources,
+        "summary_rows": summary_rows,
+        "history_rows": history_rows,
+        "rejects": rejects,
+        "failed_files": failed_files,
+    }
+    path = _partial_path(shard_dir, shard_id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    _atomic_write(path, json.dumps(partial).encode("utf-8"))
+    return path
+
+
+def missing_shards(shard_dir: str) -> List[int]:
+    plan = load_plan(shard_dir)
+    return [i for i in range(plan["num_shards"])
+            if not os.path.exists(_partial_path(shard_dir, i))]
+
+
+def merge_partials(shard_dir: str) -> Tuple[List[Dict], List[Dict], List[str], List[str]]:
+    """
+    Combine every shard's partial into (summary_rows, history_rows,
+    rejects, failed_files).
+
+    Rows are put back in the plan's file order (stable, via
+    Data_Source_File) so dedupe keeps the same row a single-node run would.
+    Raises FileNotFoundError if any shard has not finished, and ValueError
+    if any partial was written for a different plan.
+    """
+    plan = load_plan(shard_dir)
+    missing = missing_shards(shard_dir)
+    if missing:
+        raise FileNotFoundError(f"Shards not finished: {missing}")
+
+    summary_rows: List[Dict] = []
+    history_rows: List[Dict] = []
+    rejects: List[str] = []
+    failed_files: List[str] = []
+    stale: List[int] = []
+    for shard_id in range(plan["num_shards"]):
+        with open(_partial_path(shard_dir, shard_id), encoding="utf-8") as f:
+            partial = json.load(f)
+        if (partial.get("plan_id") != plan["plan_id"] or partial.get("shard") != shard_id
+                or partial.get("files") != plan["shards"][shard_id]):
+            stale.append(shard_id)
+            continue
+        summary_rows.extend(partial["summary_rows"])
+        history_rows.extend(partial["history_rows"])
+        rejects.extend(partial["rejects"])
+        failed_files.extend(partial["failed_files"])
+    if stale:
+        raise ValueError(f"Shards written for a different plan: {stale}; re-run them")
+
+    file_order = {source: i for i, source in enumerate(plan["files"])}
+
+    def _order(row: Dict) -> int:
+        return file_order.get(row.get("Data_Source_File"), len(file_order))
+
+    summary_rows.sort(key=_order)
+    history_rows.sort(key=_order)
+
+    # JSON gives every row its own string objects; share repeated values again
+    intern_rows(summary_rows, CATEGORICAL_COLUMNS)
+    intern_rows(history_rows, CATEGORICAL_COLUMNS)
+    return summary_rows, history_rows, rejects, failed_files
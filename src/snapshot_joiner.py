@@ -1,7 +1,8 @@
 """
 snapshot_joiner.py
 ------------------
-Injects the "most recent run snapshot" (columns 36–56) into each summary row.
+Injects the "most recent run snapshot" (SNAPSHOT_COLUMNS in columns.py)
+into each summary row.
 
 Group key:
     (Race_Date, Track, Race_No, Dog_Name, Box)
@@ -11,6 +12,8 @@ Rules:
     • "Most recent" = highest parsed Hist_Date (YYYY-MM-DD)
     • If Hist_Date missing or unparsable, treat as very old (rank last).
     • If no history for a dog → leave all snapshot fields blank.
+    • Fields listed in SNAPSHOT_SOURCES are read from the history column
+      the parser writes (e.g. Hist_Distance ← Hist_Distance_m).
     • No invention of values.
 """
 
@@ -18,49 +21,33 @@ import pandas as pd
 from typing import List, Dict, Tuple
 from datetime import datetime
 
+from src.columns import SNAPSHOT_COLUMNS, SNAPSHOT_SOURCES
 
-SNAPSHOT_FIELDS = [
-    "Hist_Date",
-    "Hist_Track",
-    "Hist_Distance",
-    "Hist_Finish_Pos",
-    "Hist_Margin_L",
-    "Hist_Race_Time",
-    "Hist_Sec_Time",
-    "Hist_Sec_Time_Adj",
-    "Hist_Speed_km/h",
-    "Hist_SOT",
-    "Hist_RST",
-    "Hist_BP",
-    "Hist_Odds",
-    "Hist_API",
-    "Hist_Prize_Won",
-    "Hist_Winner",
-    "Hist_2nd_Place",
-    "Hist_3rd_Place",
-    "Hist_Settled_Turn",
-    "Hist_Ongoing_Winners",
-    "Hist_Track_Direction",
-]
+
+SNAPSHOT_FIELDS = SNAPSHOT_COLUMNS
 
 
 def _group_key(row: Dict) -> Tuple[str, str, str, str, str]:
-    return (
-        (row.get("Race_Date") or "").strip(),
-        (row.get("Track") or "").strip(),
-        str(row.get("Race_No") or "").strip(),
-        (row.get("Dog_Name") or "").strip(),
-        (row.get("Box") or "").strip(),
+    # Race_No / Box are ints after normalization; compare everything as text
+    return tuple(
+        str(row.get(col) if row.get(col) is not None else "").strip()
+        for col in ("Race_Date", "Track", "Race_No", "Dog_Name", "Box")
     )
 
 
 def _parse_hist_date(d):
     """
     Parse a history date into a sortable datetime.
+    ISO dates (YYYY-MM-DD, as parse_history writes them) are read as such;
+    anything else is read day-first (DD/MM/YYYY).
     If parsing fails, return a very old date (1900-01-01) so it will rank last.
     """
     if not d:
         return datetime(1900, 1, 1)
+    try:
+        return datetime.strptime(str(d).strip(), "%Y-%m-%d")
+    except ValueError:
+        pass
     try:
         return pd.to_datetime(d, dayfirst=True)
     except Exception:
@@ -104,7 +91,7 @@ def inject_snapshot(summary_rows: List[Dict], history_rows: List[Dict]) -> List[
 
         if snapshot:
             for f in SNAPSHOT_FIELDS:
-                row[f] = snapshot.get(f, "")
+                row[f] = snapshot.get(SNAPSHOT_SOURCES.get(f, f), "")
         else:
             for f in SNAPSHOT_FIELDS:
                 row.setdefault(f, "")
@@ -1,6 +1,8 @@
 # src/summary_utils.py
 
 import re
+import sys
+from functools import lru_cache
 
 COLOUR_MAP = {
     'bl': 'Blue', 'rd': 'Red', 'bk': 'Black', 'w': 'White',
@@ -10,6 +12,26 @@ COLOUR_MAP = {
 }
 SEX_MAP = {'D': 'Dog', 'B': 'Bitch'}
 
+@lru_cache(maxsize=None)
+def encode_name(val):
+    """
+    Title-case and intern a repeated name (dog, trainer, owner).
+    Cached, so each distinct name is only title-cased once per run.
+    """
+    return sys.intern(val.title())
+
+def intern_rows(rows, columns):
+    """
+    Intern the string values of `columns` in-place across a batch of row dicts,
+    so every row shares one object per distinct value.
+    """
+    for row in rows:
+        for col in columns:
+            val = row.get(col)
+            if isinstance(val, str):
+                row[col] = sys.intern(val)
+    return rows
+
 def normalize_summary_fields(record):
     """
     Clean and normalize fields in a single race summary record.
@@ -34,15 +56,17 @@ def normalize_summary_fields(record):
         elif key == "Distance_m" and val != "":
             norm[key] = int(re.sub(r'\D', '', str(val)))
         # Dog-level fields
+        elif key in ("Track", "Race_Grade") and val:
+            norm[key] = sys.intern(val)
         elif key in ("Dog_Name", "Trainer", "Owner") and val:
-            norm[key] = val.title()
+            norm[key] = encode_name(val)
         elif key == "ColourCode" and val:
             # Normalize color code
             color = val.lower()
-            norm[key] = COLOUR_MAP.get(color, color.capitalize())
+            norm[key] = sys.intern(COLOUR_MAP.get(color, color.capitalize()))
         elif key == "Sex" and val:
             sex = val.upper()
-            norm[key] = SEX_MAP.get(sex, sex)
+            norm[key] = sys.intern(SEX_MAP.get(sex, sex))
         elif key == "Age" and val != "":
             norm[key] = int(val)
         elif key == "Box" and val != "":
@@ -0,0 +1,189 @@
+"""
+tensor_export.py
+----------------
+Memory-mappable per-race feature tensor for model training.
+
+Files (next to the CSV, same prefix):
+    <prefix>.features.npy    float32 [races, N_BOXES, features]  (NaN = blank)
+    <prefix>.mask.npy        bool    [races, N_BOXES]            runner present
+    <prefix>.race_keys.npy   str     [races, 3]   (Race_Date, Track, Race_No)
+    <prefix>.dog_names.npy   str     [races, N_BOXES]            ("" = empty box)
+    <prefix>.tensor.json     schema: shapes, feature names, axis meanings
+
+All arrays are plain (non-object) dtypes, so training can open them with
+np.load(path, mmap_mode="r") and read features without copying.
+
+Rules:
+    • Built from the typed, sorted + deduped frame that
+      enforce_schema_and_export writes to the CSV (no second dedupe).
+    • Box b sits at index b - 1; boxes outside 1..N_BOXES are skipped.
+    • Rows that share a (race, box) cell with another row are skipped,
+      not overwritten; they are listed under "box_collisions" in
+      <prefix>.tensor.json.
+    • Missing or non-numeric values stay NaN — nothing is filled in.
+      Blank keys and dog names are "".
+    • A tensor with no runners, or with rows left out for sharing a box,
+      is flagged in <prefix>.tensor.json ("status", "warnings") and on
+      the console: the race key comes from the form's meeting fields, so
+      forms that do not give each race its own key collapse into one race.
+    • Files are published through output_writers (temp file + rename), so
+      they can be written in the same concurrent batch as the CSV/Excel.
+"""
+
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Dict, Tuple
+
+from src.output_writers import write_json
+
+
+# 8 starting boxes + 2 reserves
+N_BOXES = 10
+
+RACE_KEY = ["Race_Date", "Track", "Race_No"]
+
+# Numeric SUMMARY_COLUMNS (Race_No / Box are the tensor axes, not features)
+NUMERIC_SUMMARY_FEATURES = [
+    "Distance_m", "Age",
+    "Career_Wins", "Career_Seconds", "Career_Thirds", "Career_Starters",
+    "Win_Percent", "Place_Percent", "Career_PrizeMoney",
+    "PrizeMoneyWon", "Odds",
+]
+
+# History aggregates (aggregate_history.py, benchmarks.py)
+AGGREGATE_FEATURES = [
+    "Hist_Count", "Avg_Speed_km/h", "Min_Speed_km/h", "Max_Speed_km/h",
+    "Avg_Speed_Rating", "Max_Speed_Rating",
+]
+
+# Numeric most-recent-run snapshot fields the history parser produces
+# (SNAPSHOT_COLUMNS; Hist_Distance / Hist_Race_Time are filled from
+# Hist_Distance_m / Hist_Race_Time_s, see SNAPSHOT_SOURCES)
+SNAPSHOT_FEATURES = [
+    "Hist_Distance", "Hist_Finish_Pos", "Hist_Race_Time",
+    "Hist_Speed_km/h", "Hist_Odds", "Hist_Prize_Won",
+]
+
+FEATURE_COLUMNS = NUMERIC_SUMMARY_FEATURES + AGGREGATE_FEATURES + SNAPSHOT_FEATURES
+
+
+def _npy_writer(arr: np.ndarray):
+    def write(path: str) -> None:
+        with open(path, "wb") as f:
+            np.save(f, arr)
+    return write
+
+
+def _key_text(col: pd.Series) -> pd.Series:
+    """
+    Key column as text, the way the CSV shows it: blanks as "",
+    whole-number floats without ".0".
+    """
+    values = col.astype(object)
+    values = values.where(values.notna(), "")
+    return values.map(lambda v: str(int(v)) if isinstance(v, float) and v.is_integer() else str(v))
+
+
+def build_race_tensor(df: pd.DataFrame) -> Tuple[Dict[str, np.ndarray], Dict]:
+    """
+    Build the race × box × feature tensor from the exported summary frame
+    (as returned by / shared inside enforce_schema_and_export).
+    Returns (arrays by name, schema dict for <prefix>.tensor.json).
+    """
+    n_rows = len(df)
+
+    # Box axis
+    box = pd.to_numeric(df["Box"], errors="coerce")
+    in_range = box.between(1, N_BOXES)
+    skipped = int((~in_range).sum())
+    df = df[in_range]
+    box_idx = box[in_range].astype(int).to_numpy() - 1
+
+    # Race axis (rows are already sorted by race)
+    race_text = pd.DataFrame({c: _key_text(df[c]) for c in RACE_KEY})
+    race_idx, race_uniques = pd.MultiIndex.from_frame(race_text).factorize()
+    n_races = len(race_uniques)
+
+    # One runner per (race, box): rows sharing a cell are left out rather
+    # than silently overwriting each other
+    collided = pd.Index(list(zip(race_idx, box_idx))).duplicated(keep=False)
+    collisions = [
+        {"race": list(race_uniques[r]), "box": int(b) + 1, "dog_names": names}
+        for (r, b), names in (
+            pd.DataFrame({"race": race_idx[collided], "box": box_idx[collided],
+                          "dog": _key_text(df["Dog_Name"])[collided].to_numpy()})
+            .groupby(["race", "box"], sort=True)["dog"].agg(list).items()
+        )
+    ]
+    keep = ~collided
+    df, race_idx, box_idx = df[keep], race_idx[keep], box_idx[keep]
+
+    # Feature axis — missing columns / non-numeric values become NaN
+    values = np.column_stack([
+        pd.to_numeric(df[c], errors="coerce").to_numpy(dtype=np.float32)
+        if c in df.columns else np.full(len(df), np.nan, dtype=np.float32)
+        for c in FEATURE_COLUMNS
+    ]) if len(df) else np.empty((0, len(FEATURE_COLUMNS)), dtype=np.float32)
+
+    features = np.full((n_races, N_BOXES, len(FEATURE_COLUMNS)), np.nan, dtype=np.float32)
+    mask = np.zeros((n_races, N_BOXES), dtype=bool)
+    features[race_idx, box_idx] = values
+    mask[race_idx, box_idx] = True
+
+    race_keys = np.array(list(race_uniques), dtype=str).reshape(n_races, len(RACE_KEY))
+    dog_names = np.full((n_races, N_BOXES), "", dtype=object)
+    dog_names[race_idx, box_idx] = _key_text(df["Dog_Name"]).to_numpy()
+    dog_names = dog_names.astype(str)
+
+    arrays = {
+        "features": features,
+        "mask": mask,
+        "race_keys": race_keys,
+        "dog_names": dog_names,
+    }
+
+    runners = int(mask.sum())
+    warnings = []
+    if collisions:
+        warnings.append(f"{int(collided.sum())} rows share a (race, box) cell with another "
+                        f"runner and were left out")
+    if n_rows and not runners:
+        warnings.append(f"no runners: none of the {n_rows} exported rows has a race key "
+                        f"and box of its own; the tensor is empty")
+
+    schema = {
+        "created": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "status": "ok" if runners else "empty",
+        "warnings": warnings,
+        "files": {name: f"<prefix>.{name}.npy" for name in arrays},
+        "shape": list(features.shape),
+        "dtype": "float32",
+        "axes": ["race", "box", "feature"],
+        "race_key": RACE_KEY,
+        "box_index": "box number - 1",
+        "n_boxes": N_BOXES,
+        "features": FEATURE_COLUMNS,
+        "missing": "NaN (features), False (mask), '' (dog_names)",
+        "runners": runners,
+        "skipped_rows_box_out_of_range": skipped,
+        "skipped_rows_box_collision": int(collided.sum()),
+        "box_collisions": collisions,
+    }
+    return arrays, schema
+
+
+def race_tensor_writers(df: pd.DataFrame, output_prefix: str) -> Dict:
+    """
+    Writer tasks ({name: (path, write_fn)}) for the tensor files of the
+    exported summary frame, ready for output_writers.write_outputs.
+    """
+    arrays, schema = build_race_tensor(df)
+    for warning in schema["warnings"]:
+        print(f"⚠ Tensor: {warning} (see {output_prefix}.tensor.json)")
+    tasks = {
+        f"tensor_{name}": (f"{output_prefix}.{name}.npy", _npy_writer(arr))
+        for name, arr in arrays.items()
+    }
+    tasks["tensor_schema"] = (f"{output_prefix}.tensor.json", lambda p: write_json(p, schema))
+    return tasks
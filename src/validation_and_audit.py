@@ -1,10 +1,10 @@
 # src/validation_and_audit.py
 
 import os
-import json
 import pandas as pd
 from datetime import datetime
-from src.columns import SUMMARY_COLUMNS
+from src.columns import SUMMARY_COLUMNS, SNAPSHOT_COLUMNS
+from src.output_writers import atomic_write, write_outputs, write_json
 
 AUDIT_DIR = "outputs/audit"
 
@@ -14,6 +14,27 @@ def _ensure_audit_dir():
         os.makedirs(AUDIT_DIR, exist_ok=True)
 
 
+def _write_lines(path: str, lines: list, strip: bool = False) -> None:
+    """
+    One line per entry. Report lines keep their indentation; strip=True
+    trims reject lines, which carry stray whitespace from the form.
+    """
+    with open(path, "w", encoding="utf-8") as f:
+        for line in lines:
+            f.write((line.strip() if strip else line.rstrip("\n")) + "\n")
+
+
+def write_rejects(unparsed_lines: list) -> str:
+    """
+    Write unparsed / rejected lines to rejects_unparsed.txt (one per line),
+    published atomically. Returns the path written.
+    """
+    _ensure_audit_dir()
+    rejects_path = os.path.join(AUDIT_DIR, "rejects_unparsed.txt")
+    atomic_write(rejects_path, lambda p: _write_lines(p, unparsed_lines, strip=True))
+    return rejects_path
+
+
 def audit_pipeline(summary_df: pd.DataFrame,
                    history_rows: list,
                    unparsed_lines: list,
@@ -31,6 +52,21 @@ def audit_pipeline(summary_df: pd.DataFrame,
         * No value mutation
         * Read-only — only reports issues
     """
+    audit_json, tasks = audit_writers(summary_df, history_rows, unparsed_lines, processed_files)
+    write_outputs(tasks)
+    return audit_json
+
+
+def audit_writers(summary_df: pd.DataFrame,
+                  history_rows: list,
+                  unparsed_lines: list,
+                  processed_files: list):
+    """
+    Compute the audit and return (audit_json, writer tasks) without writing,
+    so the audit files can be published in the same concurrent batch as
+    the main export (main.py passes this to enforce_schema_and_export as a
+    writer factory over the typed export frame).
+    """
 
     _ensure_audit_dir()
 
@@ -59,14 +95,9 @@ def audit_pipeline(summary_df: pd.DataFrame,
     # -------------------------
     # 4. Snapshot coverage
     # -------------------------
-    snapshot_fields = [
-        "Hist_Date", "Hist_Track", "Hist_Distance", "Hist_Finish_Pos", "Hist_Margin_L",
-        "Hist_Race_Time", "Hist_Sec_Time", "Hist_Sec_Time_Adj", "Hist_Speed_km/h",
-        "Hist_SOT", "Hist_RST", "Hist_BP", "Hist_Odds", "Hist_API", "Hist_Prize_Won",
-        "Hist_Winner", "Hist_2nd_Place", "Hist_3rd_Place", "Hist_Settled_Turn",
-        "Hist_Ongoing_Winners", "Hist_Track_Direction"
-    ]
-    any_snapshot = summary_df[snapshot_fields].notna().any(axis=1)
+    # Blank strings count as missing, as for speed above
+    snapshot = summary_df[SNAPSHOT_COLUMNS]
+    any_snapshot = (snapshot.notna() & (snapshot.astype(str) != "")).any(axis=1)
     pct_snapshot = round((any_snapshot.sum() / total_dogs) * 100, 2) if total_dogs else 0
 
     # -------------------------
@@ -82,9 +113,6 @@ def audit_pipeline(summary_df: pd.DataFrame,
     # 6. Unparsed lines
     # -------------------------
     rejects_path = os.path.join(AUDIT_DIR, "rejects_unparsed.txt")
-    with open(rejects_path, "w", encoding="utf-8") as f:
-        for line in unparsed_lines:
-            f.write(line.strip() + "\n")
 
     # -------------------------
     # 7. JSON audit summary
@@ -109,30 +137,40 @@ def audit_pipeline(summary_df: pd.DataFrame,
     }
 
     json_path = os.path.join(AUDIT_DIR, "audit_summary.json")
-    with open(json_path, "w", encoding="utf-8") as jf:
-        json.dump(audit_json, jf, indent=4)
 
     # -------------------------
     # 8. TXT human-readable summary
     # -------------------------
     txt_path = os.path.join(AUDIT_DIR, "audit_summary.txt")
-    with open(txt_path, "w", encoding="utf-8") as tf:
-        tf.write("GREYHOUND DOCX → EXCEL AUDIT REPORT\n")
-        tf.write("====================================\n\n")
-        tf.write(f"Timestamp: {now}\n\n")
-        tf.write(f"Files processed: {total_files}\n")
-        tf.write(f"Dogs parsed: {total_dogs}\n")
-        tf.write(f"Unique dogs: {unique_dog_count}\n")
-        tf.write(f"History rows: {total_history}\n\n")
-        tf.write(f"% Dogs with ≥1 history row: {pct_with_history}%\n")
-        tf.write(f"% Dogs with Avg_Speed_km/h: {pct_speed}%\n")
-        tf.write(f"% Dogs with snapshot fields: {pct_snapshot}%\n\n")
-        tf.write("Missing critical identifiers:\n")
-        tf.write(f"  Track: {missing_track}\n")
-        tf.write(f"  Race_Date: {missing_rd}\n")
-        tf.write(f"  Race_No: {missing_raceno}\n")
-        tf.write(f"  Dog_Name: {missing_dog}\n")
-        tf.write(f"  Box: {missing_box}\n\n")
-        tf.write("Unparsed lines written to rejects_unparsed.txt\n")
+    txt_lines = [
+        "GREYHOUND DOCX → EXCEL AUDIT REPORT",
+        "====================================",
+        "",
+        f"Timestamp: {now}",
+        "",
+        f"Files processed: {total_files}",
+        f"Dogs parsed: {total_dogs}",
+        f"Unique dogs: {unique_dog_count}",
+        f"History rows: {total_history}",
+        "",
+        f"% Dogs with ≥1 history row: {pct_with_history}%",
+        f"% Dogs with Avg_Speed_km/h: {pct_speed}%",
+        f"% Dogs with snapshot fields: {pct_snapshot}%",
+        "",
+        "Missing critical identifiers:",
+        f"  Track: {missing_track}",
+        f"  Race_Date: {missing_rd}",
+        f"  Race_No: {missing_raceno}",
+        f"  Dog_Name: {missing_dog}",
+        f"  Box: {missing_box}",
+        "",
+        "Unparsed lines written to rejects_unparsed.txt",
+    ]
 
-    return audit_json
+    tasks = {
+        "audit_rejects": (rejects_path, lambda p: _write_lines(p, unparsed_lines, strip=True)),
+        "audit_json": (json_path, lambda p: write_json(p, audit_json)),
+        "audit_txt": (txt_path, lambda p: _write_lines(p, txt_lines)),
+    }
+
+    return audit_json, tasks
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+from src.aggregate_history import aggregate_speeds
+
+
+def _loop_aggregate_speeds(history_df):
+    """
+    The per-group loop aggregate_speeds used before the vectorised rewrite,
+    kept as the reference result.
+    """
+    df = history_df.copy()
+    df["Hist_Speed_km/h"] = pd.to_numeric(df["Hist_Speed_km/h"], errors="coerce")
+    key_cols = ["Track", "Race_Date", "Race_No", "Box", "Dog_Name"]
+
+    speed_agg = {}
+    for key, group in df.groupby(key_cols):
+        speeds = group["Hist_Speed_km/h"].dropna()
+        speed_agg[key] = {
+            "Avg_Speed_km/h": speeds.mean() if len(speeds) else np.nan,
+            "Min_Speed_km/h": speeds.min() if len(speeds) else np.nan,
+            "Max_Speed_km/h": speeds.max() if len(speeds) else np.nan,
+            "Hist_Count": len(group),
+        }
+    return speed_agg
+
+
+def _history_df(n_dogs=40, runs_per_dog=6, seed=0):
+    rng = np.random.default_rng(seed)
+    rows = []
+    for d in range(n_dogs):
+        for r in range(runs_per_dog):
+            speed = round(float(rng.uniform(55, 65)), 2)
+            rows.append({
+                "Track": ["SALE", "RICH", "QSTR"][d % 3],
+                "Race_Date": "2025-09-07",
+                "Race_No": d % 10 + 1,
+                "Box": d % 8 + 1,
+                "Dog_Name": f"Dog {d}",
+                # Blanks and junk must count towards Hist_Count but not speeds
+                "Hist_Speed_km/h": "" if r == 0 else ("n/a" if r == 1 and d % 5 == 0 else speed),
+            })
+    # One dog with no usable speed at all
+    rows.append({"Track": "SALE", "Race_Date": "2025-09-07", "Race_No": 1, "Box": 9,
+                 "Dog_Name": "No Speed", "Hist_Speed_km/h": ""})
+    return pd.DataFrame(rows)
+
+
+def _assert_same(actual, expected):
+    assert set(actual) == set(expected)
+    for key, exp in expected.items():
+        got = actual[key]
+        assert got["Hist_Count"] == exp["Hist_Count"]
+        for col in ("Avg_Speed_km/h", "Min_Speed_km/h", "Max_Speed_km/h"):
+            np.testing.assert_allclose(got[col], exp[col], equal_nan=True)
+
+
+def test_matches_loop_implementation():
+    df = _history_df()
+    _assert_same(aggregate_speeds(df), _loop_aggregate_speeds(df))
+
+
+def test_matches_loop_with_categorical_keys():
+    df = _history_df()
+    categorical = df.astype({"Track": "category", "Dog_Name": "category"})
+    _assert_same(aggregate_speeds(categorical), _loop_aggregate_speeds(df))
+
+
+def test_empty_history():
+    assert aggregate_speeds(pd.DataFrame()) == {}
+    assert aggregate_speeds(None) == {}
@@ -0,0 +1,99 @@
+import io
+import os
+import tarfile
+import zipfile
+
+import pandas as pd
+from docx import Document
+
+import main
+from src.parse_watchdog import parse_files
+from src.read_docx import split_archive_source
+
+
+def _form_bytes(dog_name):
+    doc = Document()
+    for text in ["Feature Form", "02/09/2025 SALE Race No 3 Name: TEST STAKE", "",
+                 "1.", dog_name, "0kg (2) bk 1 D\tJUDITH MCMAHON Horse: 3-4-14 21%-50%"]:
+        doc.add_paragraph(text)
+    buf = io.BytesIO()
+    doc.save(buf)
+    return buf.getvalue()
+
+
+def _write_zip(path, members):
+    with zipfile.ZipFile(path, "w") as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+    return str(path)
+
+
+def _write_tar(path, members):
+    with tarfile.open(path, "w:gz") as tf:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tf.addfile(info, io.BytesIO(data))
+    return str(path)
+
+
+def test_find_docx_files_lists_archive_members(tmp_path):
+    _write_zip(tmp_path / "bundle.zip", {
+        "day1/a.docx": _form_bytes("ZIP DOG"),
+        "__MACOSX/day1/._a.docx": b"",
+        "day1/~$a.docx": b"",
+        "notes.txt": b"",
+    })
+    (tmp_path / "plain.docx").write_bytes(_form_bytes("PLAIN DOG"))
+
+    files, bad = main.find_docx_files(str(tmp_path))
+
+    assert bad == []
+    assert files == [str(tmp_path / "plain.docx"), f"{tmp_path / 'bundle.zip'}!day1/a.docx"]
+
+
+def test_split_archive_source_with_bang_in_directory():
+    assert split_archive_source("data/wk!1/bundle.tar.gz!forms/a.docx") == (
+        "data/wk!1/bundle.tar.gz", "forms/a.docx")
+    assert split_archive_source("data/wk!1/a.docx") == (None, "data/wk!1/a.docx")
+
+
+def test_tar_members_stream_in_order(tmp_path):
+    names = ["c.docx", "a.docx", "b.docx"]
+    archive = _write_tar(tmp_path / "bundle.tar.gz",
+                         {n: _form_bytes(f"DOG {n[0].upper()}") for n in names})
+
+    files, bad = main.find_docx_files(str(tmp_path))
+    summary, _, rejects, failed = parse_files(files, workers=2)
+
+    assert files == [f"{archive}!{n}" for n in names]
+    assert failed == [] and rejects == []
+    dogs = [row for row in summary if row["Dog_Name"] != "Feature Form"]
+    assert [row["Dog_Name"] for row in dogs] == ["Dog C", "Dog A", "Dog B"]
+
+
+def test_truncated_bundle_does_not_stop_discovery(tmp_path):
+    good = _write_zip(tmp_path / "good.zip", {"a.docx": _form_bytes("GOOD DOG")})
+    bad = _write_tar(tmp_path / "bad.tar.gz", {"b.docx": _form_bytes("LOST DOG")})
+    data = open(bad, "rb").read()
+    with open(bad, "wb") as f:
+        f.write(data[:len(data) // 2])
+
+    files, bad_archives = main.find_docx_files(str(tmp_path))
+
+    assert bad_archives == [bad]
+    assert files == [f"{good}!a.docx"]
+
+
+def test_data_source_file_reaches_csv(tmp_path, monkeypatch):
+    archive = _write_zip(tmp_path / "bundle.zip", {"forms/a.docx": _form_bytes("ZIP DOG")})
+    monkeypatch.chdir(tmp_path)
+
+    files, _ = main.find_docx_files(str(tmp_path))
+    summary, history, rejects, failed = parse_files(files, workers=1)
+    main.run_pipeline(summary, history, rejects, failed, files)
+
+    df = pd.read_csv(f"{main.OUTPUT_PREFIX}.csv", encoding="utf-8-sig")
+    row = df.set_index("Dog_Name").loc["Zip Dog"]
+    assert row["Data_Source_File"] == f"{archive}!forms/a.docx"
+    assert os.path.exists(f"{main.OUTPUT_PREFIX}.manifest.json")
@@ -0,0 +1,41 @@
+import json
+import os
+
+import pytest
+
+from src.output_writers import write_outputs
+
+
+def _text_writer(text):
+    def write(path):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+    return write
+
+
+def _failing_writer(path):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("half a fi")
+    raise RuntimeError("disk full")
+
+
+def test_failed_writer_keeps_previous_file(tmp_path):
+    csv_path, txt_path = str(tmp_path / "out.csv"), str(tmp_path / "out.txt")
+    manifest_path = str(tmp_path / "out.manifest.json")
+    write_outputs({"csv": (csv_path, _text_writer("run 1\n")),
+                   "txt": (txt_path, _text_writer("run 1\n"))}, manifest_path=manifest_path)
+
+    with pytest.raises(RuntimeError, match="disk full"):
+        write_outputs({"csv": (csv_path, _failing_writer),
+                       "txt": (txt_path, _text_writer("run 2\n"))}, manifest_path=manifest_path)
+
+    with open(csv_path, encoding="utf-8") as f:
+        assert f.read() == "run 1\n"
+    with open(txt_path, encoding="utf-8") as f:
+        assert f.read() == "run 2\n"
+    with open(manifest_path, encoding="utf-8") as f:
+        outputs = json.load(f)["outputs"]
+    assert outputs["csv"] == {"path": csv_path, "error": "disk full"}
+    assert outputs["txt"]["sha256"]
+    # No temp files left behind
+    assert sorted(os.listdir(tmp_path)) == ["out.csv", "out.manifest.json", "out.txt"]
@@ -0,0 +1,106 @@
+import re
+
+import pytest
+from docx import Document
+
+import src.parse_history
+from src.parse_data import DOG_DETAIL_PATTERN, MEETING_RACE_PATTERN, _safe_detail_match, _safe_race_match
+from src.parse_history import HIST_PATTERN, _safe_history_match
+from src.parse_watchdog import parse_files
+
+
+HIST_LINE = ("2nd of 8 28/10/2025 SALE Margin 1.5 Lengths Distance 435m SOT G RST T3 GR 5 "
+             "Race TEST STAKE Prize $1,530 API 0.5 Race Time 0:24.90 Sec Time 5.40 "
+             "BP 1 Odds 2.5 Prize Won $120 Trainer Test Trainer")
+
+# Backtracks for ever under HIST_PATTERN = ^(\w+\s?)+Prize Won
+HANG_LINE = "abcdefghijklmnopqrstuvwxyzabcdefgh!"
+
+
+def _write_form(path, dog_names, extra_lines=()):
+    doc = Document()
+    for text in ["Feature Form", "02/09/2025 SALE Race No 3 Name: TEST STAKE", ""]:
+        doc.add_paragraph(text)
+    for i, name in enumerate(dog_names, 1):
+        for text in [f"{i}.", name, f"0kg (2) bk {i} D\tJUDITH MCMAHON Horse: 3-4-14 21%-50%",
+                     HIST_LINE, *extra_lines, ""]:
+            doc.add_paragraph(text)
+    doc.save(path)
+    return str(path)
+
+
+@pytest.mark.parametrize("line", [
+    HIST_LINE,
+    HIST_LINE.replace("0:24.90", "24.90"),
+    HIST_LINE.replace("Distance 435m", "Distance 435 m Distance x"),
+    HIST_LINE.replace("Prize Won $120", "Prize Won 120"),
+    HIST_LINE.replace("2nd of 8", "2 of 8"),
+    "1st of 8 02/09/2025 SALE Distance 435m Race Time 0:24.90 Sec Prize Won $0",
+    "",
+    HANG_LINE,
+])
+def test_safe_history_matcher_agrees_with_regex(line):
+    m = HIST_PATTERN.search(line)
+    assert _safe_history_match(line) == (m.groupdict() if m else None)
+
+
+@pytest.mark.parametrize("line", [
+    "0kg (2) bk 3 D\tJUDITH MCMAHON Horse: 3-4-14 21%-50%",
+    "(4) bl/w 2 B Jo Bloggs Horse: 7-22-56 12%-51%",
+    "0kg (2) bk 3 D JUDITH Horse: 3 21%-50%",
+    "0kg (2) bk 3 X JUDITH Horse: 3-4-14 21%-50%",
+    "",
+])
+def test_safe_detail_matcher_agrees_with_regex(line):
+    m = DOG_DETAIL_PATTERN.search(line)
+    safe = _safe_detail_match(line)
+    if m is None:
+        assert safe is None
+    else:
+        fields = {k: v for k, v in m.groupdict().items() if k in safe}
+        assert safe == fields
+
+
+@pytest.mark.parametrize("text", [
+    "02/09/2025 SALE Race No 3 Name: TEST STAKE 435m",
+    "Race No. 12 x Name: 7 Name: TEST",
+    "Race No 1 no name here Race No 2 Name: LATER",
+    "Race No 1 Name:\nName: NEXT LINE",
+    "Race No 1 " * 50,
+    "",
+])
+def test_safe_race_matcher_agrees_with_regex(text):
+    m = MEETING_RACE_PATTERN.search(text)
+    assert _safe_race_match(text) == (m.groups() if m else None)
+
+
+def test_hanging_worker_is_killed_and_retried_safe(tmp_path, monkeypatch):
+    # fork carries the patched pattern into the worker
+    monkeypatch.setattr(src.parse_history, "HIST_PATTERN", re.compile(r'^(\w+\s?)+Prize Won'))
+    path = _write_form(tmp_path / "hang.docx", ["SLOW DOG"], [HANG_LINE])
+
+    summary, history, rejects, failed = parse_files([path], workers=1, line_budget_s=0.2)
+
+    assert failed == []
+    # The form header parses as a dog-less row ahead of the dogs
+    assert [row["Dog_Name"] for row in summary][1:] == ["Slow Dog"]
+    assert len(history) == 1
+    assert rejects == [f"{path}: [killed over 0.2s line budget with regex parser] {HANG_LINE}"]
+
+
+def test_results_come_back_in_input_order(tmp_path):
+    paths = [
+        _write_form(tmp_path / "big.docx", [f"DOG {chr(65 + i)}" for i in range(20)]),
+        _write_form(tmp_path / "small.docx", ["ONLY DOG"]),
+        _write_form(tmp_path / "mid.docx", ["FIRST DOG", "SECOND DOG"]),
+    ]
+
+    summary, history, rejects, failed = parse_files(paths, workers=3)
+
+    assert failed == [] and rejects == []
+    # Each form also yields one row for its header section
+    dogs = [row for row in summary if row["Dog_Name"] != "Feature Form"]
+    sources = [row["Data_Source_File"] for row in dogs]
+    assert sources == [paths[0]] * 20 + [paths[1]] + [paths[2]] * 2
+    assert [row["Data_Source_File"] for row in history] == sources
+    assert [row["Dog_Name"] for row in dogs][-3:] == ["Only Dog", "First Dog", "Second Dog"]
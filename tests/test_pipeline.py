@@ -0,0 +1,104 @@
+import json
+import os
+
+import pandas as pd
+
+import main
+from src.parse_data import parse_data
+from src.snapshot_joiner import inject_snapshot
+
+
+def _hist_line(pos, date, secs, odds):
+    return (f"{pos} of 8 {date} SALE Margin 1.5 Lengths Distance 435m SOT G RST T3 GR 5 "
+            f"Race TEST STAKE Prize $1,530 API 0.5 Race Time 0:{secs} Sec Time 5.40 "
+            f"BP 1 Odds {odds} Prize Won $120 Trainer Test Trainer")
+
+
+def _form_paragraphs():
+    """
+    A minimal form: two dogs, three SALE 435m runs each (six runs in all,
+    enough for a benchmark).
+    """
+    return [
+        "Feature Form",
+        "",
+        "1.",
+        "DR. GIANNA",
+        "0kg (1) blu 2 B\tJENNIFER GILL Horse: 1-1-10 10%-20%",
+        "Owner: Jane Citizen",
+        _hist_line("1st", "02/09/2025", "24.90", "2.5"),
+        _hist_line("2nd", "20/08/2025", "25.10", "4.0"),
+        _hist_line("3rd", "05/08/2025", "25.30", "6.0"),
+        "",
+        "2.",
+        "DR. AZURE",
+        "0kg (2) bk 3 D\tJUDITH MCMAHON Horse: 3-4-14 21%-50%",
+        "Owner: John Citizen",
+        _hist_line("4th", "03/09/2025", "25.00", "8.0"),
+        _hist_line("5th", "21/08/2025", "25.20", "10.0"),
+        _hist_line("6th", "06/08/2025", "25.40", "12.0"),
+        "",
+        "3.",
+        "NO HISTORY",
+        "0kg (2) bk 4 D\tJUDITH MCMAHON Horse: 0-0-0 0%-0%",
+    ]
+
+
+def test_history_rows_carry_summary_key():
+    records, history = parse_data(_form_paragraphs())
+    assert [r["Dog_Name"] for r in records][-3:] == ["Dr. Gianna", "Dr. Azure", "No History"]
+    assert len(history) == 6
+    assert {(h["Dog_Name"], h["Box"]) for h in history} == {("Dr. Gianna", 2), ("Dr. Azure", 3)}
+    assert all(h["Hist_Speed_km/h"] for h in history)
+
+
+def test_ratings_land_in_csv(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    records, history = parse_data(_form_paragraphs())
+
+    main.run_pipeline(records, history, ["form.docx: [line over 2000 chars] x"], [], ["form.docx"])
+
+    df = pd.read_csv(f"{main.OUTPUT_PREFIX}.csv", encoding="utf-8-sig")
+    rated = df.set_index("Dog_Name").loc[["Dr. Gianna", "Dr. Azure"]]
+    assert (rated["Hist_Count"] == 3).all()
+    assert rated["Avg_Speed_km/h"].notna().all()
+    assert rated["Avg_Speed_Rating"].notna().all()
+    assert rated["Max_Speed_Rating"].notna().all()
+    # Faster runs than the benchmark median rate above 100
+    assert rated.loc["Dr. Gianna", "Max_Speed_Rating"] > 100
+
+    no_history = df.set_index("Dog_Name").loc["No History"]
+    assert no_history["Hist_Count"] == 0
+    assert pd.isna(no_history["Avg_Speed_Rating"])
+
+
+def test_snapshot_takes_latest_run_with_int_box():
+    records, history = parse_data(_form_paragraphs())
+    rows = inject_snapshot(records, history)
+    gianna = next(r for r in rows if r["Dog_Name"] == "Dr. Gianna")
+    # 2025-09-02 is newer than 2025-08-05 (ISO dates must not be read day-first)
+    assert gianna["Hist_Date"] == "2025-09-02"
+    assert gianna["Hist_Odds"] == 2.5
+
+
+def test_all_outputs_published_in_one_batch(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    records, history = parse_data(_form_paragraphs())
+
+    main.run_pipeline(records, history, ["form.docx: [line over 2000 chars] x"], [], ["form.docx"])
+
+    with open(f"{main.OUTPUT_PREFIX}.manifest.json", encoding="utf-8") as f:
+        outputs = json.load(f)["outputs"]
+    for name in ("csv", "xlsx", "digests", "tensor_features", "tensor_schema",
+                 "audit_json", "audit_txt", "audit_rejects"):
+        assert os.path.exists(outputs[name]["path"]), name
+        assert outputs[name]["sha256"]
+
+    with open(outputs["audit_json"]["path"], encoding="utf-8") as f:
+        audit = json.load(f)
+    assert audit["files_processed"] == 1
+    assert audit["dogs_parsed"] == len(records)
+    with open(outputs["audit_rejects"]["path"], encoding="utf-8") as f:
+        assert f.read() == "form.docx: [line over 2000 chars] x\n"
+    with open(outputs["audit_txt"]["path"], encoding="utf-8") as f:
+        assert "\n  Track: 0\n" in f.read()
@@ -0,0 +1,52 @@
+import pandas as pd
+
+import main
+from src import query_index
+
+
+def _race(dogs, race_no=4):
+    return pd.DataFrame([
+        {"Race_Date": "2025-09-07", "Track": "SALE", "Race_No": race_no,
+         "Dog_Name": name, "Box": box, "Trainer": "Jennifer Gill"}
+        for name, box in dogs
+    ])
+
+
+def test_reexported_race_replaces_stale_rows(tmp_path):
+    db = str(tmp_path / "index.sqlite")
+    query_index.update_query_index(_race([("Dr. Gianna", 1), ("Dr. Azur", 2)]), db)
+    query_index.update_query_index(_race([("Other Race", 1)], race_no=5), db)
+
+    # Re-parse corrected a Dog_Name and a Box in race 4
+    query_index.update_query_index(_race([("Dr. Gianna", 3), ("Dr. Azure", 2)]), db)
+
+    runners = query_index.query_race("2025-09-07", "sale", 4, db)
+    assert [(r["Dog_Name"], r["Box"]) for r in runners] == [("Dr. Azure", 2), ("Dr. Gianna", 3)]
+    # Races missing from the export are left alone
+    assert len(query_index.query_race("2025-09-07", "SALE", 5, db)) == 1
+
+
+def test_refresh_rebuilds_from_csv(tmp_path):
+    db = str(tmp_path / "index.sqlite")
+    query_index.update_query_index(_race([("Dr. Gianna", 1)], race_no=9), db)
+
+    csv_path = tmp_path / "master.csv"
+    _race([("Dr. Azure", 2)]).to_csv(csv_path, index=False, encoding="utf-8-sig")
+    query_index.refresh_from_csv(str(csv_path), db)
+
+    assert query_index.query_trainer("jennifer gill", db_path=db)[0]["Dog_Name"] == "Dr. Azure"
+    assert len(query_index.query_trainer("jennifer gill", db_path=db)) == 1
+
+
+def test_cli_options_follow_the_subcommand(tmp_path, capsys):
+    db = str(tmp_path / "index.sqlite")
+    query_index.update_query_index(_race([("Dr. Gianna", 1)]), db)
+
+    parser = main.build_arg_parser()
+    args = parser.parse_args(["query", "dog", "Dr. Gianna", "--db", db, "--all-columns"])
+    assert (args.db, args.all_columns) == (db, True)
+    assert args.func(args) == 0
+    assert "Jennifer Gill" in capsys.readouterr().out
+
+    args = parser.parse_args(["query", "refresh", "--db", db, "--csv", "x.csv"])
+    assert (args.db, args.csv) == (db, "x.csv")
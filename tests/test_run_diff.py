@@ -0,0 +1,45 @@
+import pandas as pd
+
+from src.merge_sort_export import enforce_schema_and_export
+from src.run_diff import diff_runs, load_digest_index, row_digests
+
+
+def _dog(name, box, odds, trainer="Jennifer Gill"):
+    return {"Race_Date": "2025-09-07", "Track": "SALE", "Race_No": 4, "Dog_Name": name,
+            "Box": box, "Trainer": trainer, "Odds": odds, "Distance_m": 435}
+
+
+def _export(tmp_path, name, rows):
+    prefix = str(tmp_path / name / "all_dogs_master")
+    (tmp_path / name).mkdir()
+    enforce_schema_and_export(rows, prefix)
+    return prefix
+
+
+def test_diff_reports_added_removed_and_changed(tmp_path):
+    old = _export(tmp_path, "old", [_dog("Dr. Gianna", 1, 2.5), _dog("Dr. Azure", 2, 4.0),
+                                    _dog("Gone Dog", 3, 6.0)])
+    new = _export(tmp_path, "new", [_dog("Dr. Gianna", 1, 3.5, trainer="Judith Mcmahon"),
+                                    _dog("Dr. Azure", 2, 4.0), _dog("New Dog", 4, 8.0)])
+
+    report = diff_runs(old, new)
+
+    assert report["added"]["Dog_Name"].tolist() == ["New Dog"]
+    assert report["removed"]["Dog_Name"].tolist() == ["Gone Dog"]
+    assert (report["changed_rows"], report["unchanged_rows"]) == (1, 1)
+    assert report["column_counts"] == {"Trainer": 1, "Odds": 1}
+    changed = report["changed"].set_index("Column")
+    assert changed.loc["Odds", ["Dog_Name", "Old", "New"]].tolist() == ["Dr. Gianna", "2.5", "3.5"]
+    assert changed.loc["Trainer", ["Old", "New"]].tolist() == ["Jennifer Gill", "Judith Mcmahon"]
+
+
+def test_sidecar_digests_match_the_written_csv(tmp_path):
+    prefix = _export(tmp_path, "run", [_dog("Dr. Gianna", 1, 2.5), _dog("Dr. Azure", 2, None),
+                                       _dog("No Box", "", 4.0)])
+
+    written = pd.read_csv(f"{prefix}.csv", dtype=str, keep_default_na=False, encoding="utf-8-sig")
+    sidecar = load_digest_index(prefix)
+
+    assert len(sidecar) == len(written)
+    assert sidecar["Row"].astype(int).tolist() == list(range(len(written)))
+    assert row_digests(written).tolist() == sidecar["Row_Digest"].tolist()
@@ -0,0 +1,75 @@
+import json
+import os
+
+import pytest
+
+from src import shard
+
+
+FILES = [
+    "data/QSTR_2025-09-07 conv.docx",
+    "data/RICH_2025-09-07 conv.docx",
+    "data/SALE_2025-09-07 conv.docx",
+]
+
+
+def test_single_date_is_split_across_shards():
+    shards = shard.assign_shards(FILES, 3, by="date")
+    assert sorted(len(s) for s in shards) == [1, 1, 1]
+    assert sorted(sum(shards, [])) == sorted(FILES)
+
+
+def test_dates_stay_on_contiguous_shards():
+    sources = FILES + ["data/SALE_2025-09-08 conv.docx"]
+    shards = shard.assign_shards(sources, 3, by="date")
+    # Three files on the 7th, one on the 8th: the 7th gets two shards
+    assert shards[2] == ["data/SALE_2025-09-08 conv.docx"]
+    assert sorted(shards[0] + shards[1]) == sorted(FILES)
+    assert shard.assign_shards(sources, 3, by="date") == shards
+
+
+def _write_partials(shard_dir, plan):
+    for shard_id, sources in enumerate(plan["shards"]):
+        partial = {
+            "shard": shard_id,
+            "plan_id": plan["plan_id"],
+            "files": sources,
+            "summary_rows": [{"Dog_Name": "Dog", "Data_Source_File": s} for s in sources],
+            "history_rows": [],
+            "rejects": [],
+            "failed_files": [],
+        }
+        path = os.path.join(shard_dir, shard.PARTIALS_DIR, f"shard-{shard_id:04d}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(partial, f)
+
+
+def test_merge_reads_json_partials_in_plan_order(tmp_path):
+    shard_dir = str(tmp_path)
+    plan = shard.plan_shards(FILES, 2, shard_dir, by="hash")
+    _write_partials(shard_dir, plan)
+
+    assert shard.missing_shards(shard_dir) == []
+    summary_rows, _, _, _ = shard.merge_partials(shard_dir)
+    assert [r["Data_Source_File"] for r in summary_rows] == FILES
+
+
+def test_replanning_clears_old_partials(tmp_path):
+    shard_dir = str(tmp_path)
+    _write_partials(shard_dir, shard.plan_shards(FILES, 2, shard_dir, by="hash"))
+
+    shard.plan_shards(FILES, 3, shard_dir, by="date")
+
+    assert shard.missing_shards(shard_dir) == [0, 1, 2]
+
+
+def test_merge_refuses_partials_from_another_plan(tmp_path):
+    shard_dir = str(tmp_path)
+    old_plan = shard.plan_shards(FILES, 2, shard_dir, by="hash")
+    new_plan = shard.plan_shards(FILES, 2, shard_dir, by="date")
+    assert new_plan["plan_id"] != old_plan["plan_id"]
+    # A node still working on the old plan finishes after the re-plan
+    _write_partials(shard_dir, old_plan)
+
+    with pytest.raises(ValueError, match="different plan"):
+        shard.merge_partials(shard_dir)
@@ -0,0 +1,103 @@
+import os
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from docx import Document
+
+from src.merge_sort_export import _ensure_schema, _dedupe_sort
+from src.parse_data import parse_data
+from src.snapshot_joiner import inject_snapshot
+from src.tensor_export import build_race_tensor, FEATURE_COLUMNS, N_BOXES, SNAPSHOT_FEATURES
+
+
+SALE_FORM = os.path.join(os.path.dirname(__file__), "..", "data", "SALE_2025-09-07 conv.docx")
+
+
+def _export_frame(rows):
+    return _dedupe_sort(_ensure_schema(pd.DataFrame(rows)))
+
+
+def _row(race_no, box, dog, odds):
+    return {"Race_Date": "2025-09-07", "Track": "SALE", "Race_No": race_no,
+            "Box": box, "Dog_Name": dog, "Odds": odds}
+
+
+def test_layout_and_blank_race_no():
+    df = _export_frame([
+        _row(4, 1, "Dr. Gianna", 2.5),
+        _row(4, 3, "Dr. Azure", 6.0),
+        _row("", 2, "No Race", 9.0),
+    ])
+    arrays, schema = build_race_tensor(df)
+
+    assert arrays["features"].shape == (2, N_BOXES, len(FEATURE_COLUMNS))
+    assert arrays["features"].dtype == np.float32
+    assert arrays["race_keys"].tolist() == [["2025-09-07", "SALE", "4"], ["2025-09-07", "SALE", ""]]
+    assert arrays["mask"].sum() == schema["runners"] == 3
+    assert arrays["dog_names"][0, 2] == "Dr. Azure"
+    assert arrays["dog_names"][0, 1] == ""
+    assert arrays["features"][0, 0, FEATURE_COLUMNS.index("Odds")] == np.float32(2.5)
+    assert np.isnan(arrays["features"][0, 1]).all()
+
+
+def test_shared_box_is_skipped_and_recorded():
+    df = _export_frame([
+        _row(4, 1, "Dr. Gianna", 2.5),
+        _row(4, 1, "Dr. Mitch", 3.0),
+        _row(4, 2, "Dr. Azure", 6.0),
+    ])
+    arrays, schema = build_race_tensor(df)
+
+    assert schema["runners"] == 1
+    assert schema["skipped_rows_box_collision"] == 2
+    assert schema["box_collisions"] == [
+        {"race": ["2025-09-07", "SALE", "4"], "box": 1, "dog_names": ["Dr. Gianna", "Dr. Mitch"]}
+    ]
+    assert not arrays["mask"][0, 0]
+    assert arrays["dog_names"][0, 1] == "Dr. Azure"
+    assert schema["status"] == "ok"
+    assert schema["warnings"]
+
+
+def test_empty_tensor_is_flagged():
+    df = _export_frame([_row(4, 1, "Dr. Gianna", 2.5), _row(4, 1, "Dr. Mitch", 3.0)])
+    arrays, schema = build_race_tensor(df)
+
+    assert not arrays["mask"].any()
+    assert schema["status"] == "empty"
+    assert any(w.startswith("no runners") for w in schema["warnings"])
+
+
+@lru_cache(maxsize=None)
+def _sale_paragraphs():
+    return tuple(p.text for p in Document(SALE_FORM).paragraphs)
+
+
+def _real_form_paragraphs(races):
+    """
+    The first `races` races of a real form (each starts at a "Race No" header).
+    """
+    paragraphs = list(_sale_paragraphs())
+    starts = [i for i, p in enumerate(paragraphs) if p.startswith("Race No")]
+    return paragraphs[:starts[races]]
+
+
+def test_snapshot_features_are_produced_by_the_parser():
+    records, history = parse_data(_real_form_paragraphs(1))
+    df = _export_frame(inject_snapshot(records, history))
+
+    for col in SNAPSHOT_FEATURES:
+        assert pd.to_numeric(df[col], errors="coerce").notna().any(), col
+
+
+def test_real_form_tensor_flags_lost_runners():
+    records, history = parse_data(_real_form_paragraphs(2))
+    df = _export_frame(inject_snapshot(records, history))
+    arrays, schema = build_race_tensor(df)
+
+    placed = schema["runners"] + schema["skipped_rows_box_collision"]
+    assert placed + schema["skipped_rows_box_out_of_range"] == len(df)
+    assert schema["status"] == ("ok" if schema["runners"] else "empty")
+    if schema["runners"] < len(df) - schema["skipped_rows_box_out_of_range"]:
+        assert schema["warnings"]